@@ -1,47 +1,16 @@
 import streamlit as st
-import base64
+from core.assets import page_background_css
+from core.lean_scoring import warm_up
 
 # Set page config
 st.set_page_config(page_title="About Carbon Footprint", layout="centered")
 st.title("Carbon Emission")
 
-# Function to get base64 string of the image
-def get_base64(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+# Start loading the model in the background so the first prediction is instant
+warm_up(background=True)
 
-# Background image
-img_path = "Images/background_min.jpg"
-img_base64 = get_base64(img_path)
-
-# Inject CSS
-page_bg_img = f"""
-<style>
-[data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img_base64}");
-    background-size: cover;
-    background-position: center;
-    background-repeat: no-repeat;
-}}
-
-.container {{
-    background-color: rgba(255, 255, 255, 0.85);
-    padding: 3rem;
-    border-radius: 20px;
-    margin: auto;
-    max-width: 900px;
-    font-family: 'Arial', sans-serif;
-    color: #333;
-}}
-
-[data-testid="stSidebar"] {{
-    background-color: black;
-    color: #333;
-}}
-</style>
-"""
-st.markdown(page_bg_img, unsafe_allow_html=True)
+# Inject CSS (background served from static/, encoded at most once per process)
+st.markdown(page_background_css(), unsafe_allow_html=True)
 
 # Main content
 st.markdown('<div class="container">', unsafe_allow_html=True)
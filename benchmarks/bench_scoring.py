@@ -0,0 +1,249 @@
+"""Latency / throughput / memory benchmarks for the scoring path.
+
+Usage:
+    python benchmarks/bench_scoring.py                    # run and compare with baseline.json
+    python benchmarks/bench_scoring.py --save-baseline    # run and store the results as the new baseline
+    python benchmarks/bench_scoring.py --only predict --batch-sizes 1 1000
+
+Each benchmark reports p50/p99 latency per call and the peak Python-tracked
+memory of one call (tracemalloc, which includes NumPy buffers). Calls faster
+than MIN_SAMPLE_MS are timed in loops of many calls, so every sample is well
+above the timer's resolution. A benchmark whose p50 exceeds the baseline by
+more than --tolerance and by more than --min-delta-ms is flagged. The suite is
+then run again (up to --retries times, keeping each benchmark's best p50), and
+only benchmarks still slower after that make the script exit with status 1.
+--save-baseline runs the suite 1 + --retries times and stores each benchmark's
+median run, so the baseline is a typical timing rather than a lucky one.
+
+The per-member ``predict/<member>/<n>`` entries only appear for an ensemble; a
+single model is measured once, as ``predict/combined/<n>``.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import schema  # noqa: E402
+from core.features import get_feature_encoder, legacy_transform  # noqa: E402
+from core.artifact import load_artifact  # noqa: E402
+from core.model_bundle import ARTIFACT_DIR, MODEL_DIR, get_model_bundle, load_pickles  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_BATCH_SIZES = [1, 100, 10_000, 100_000]
+SUITES = ["load", "encode", "predict", "charts", "pdf", "feedback"]
+# Shortest sample worth timing; faster calls are repeated within one sample
+MIN_SAMPLE_MS = 1.0
+
+
+def measure(fn, min_time=0.5, min_reps=3, max_reps=200):
+    """Time ``fn`` repeatedly, then run it once more under tracemalloc for its peak memory."""
+    start = time.perf_counter()
+    fn()  # warm-up
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    fn()
+    single = min(first, time.perf_counter() - start)
+    number = max(1, int(MIN_SAMPLE_MS / 1000 / max(single, 1e-9)))
+
+    timings = []
+    deadline = time.perf_counter() + min_time
+    gc.disable()  # as timeit does: a collection landing in one sample is not the code's cost
+    try:
+        while len(timings) < min_reps or (time.perf_counter() < deadline and len(timings) < max_reps):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            timings.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.array(timings) * 1000
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "reps": len(timings),
+        "calls_per_rep": number,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def ensemble_members(model):
+    """The VotingRegressor's members by name; none for a single model, which ``predict/combined`` already covers."""
+    return dict(getattr(model, "named_estimators_", None) or {})
+
+
+def bench_load(results):
+    # Checksum and unpickle, as a worker does on its first cold load
+    results["load/artifacts"] = measure(lambda: load_pickles(MODEL_DIR), min_time=1.0)
+    if os.path.isdir(os.path.join(MODEL_DIR, ARTIFACT_DIR)):
+        results["load/versioned_artifact"] = measure(load_artifact, min_time=1.0)
+
+
+def bench_encode(results, bundle):
+    import pandas as pd
+
+    encoder = get_feature_encoder(bundle)
+    profile = schema.random_profile(random.Random(0))
+    results["encode/row"] = measure(lambda: encoder.encode(profile))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        results["encode/row_dataframe_pipeline"] = measure(lambda: legacy_transform(pd.DataFrame([profile]), bundle))
+
+
+def bench_predict(results, bundle, batch_sizes):
+    import pandas as pd
+
+    encoder = get_feature_encoder(bundle)
+    rng = random.Random(0)
+    frame = pd.DataFrame([schema.random_profile(rng) for _ in range(max(batch_sizes))])
+    X_all = encoder.encode_frame(frame)
+
+    for n in batch_sizes:
+        df, X = frame.iloc[:n], X_all[:n]
+        results[f"encode/frame/{n}"] = measure(lambda: encoder.encode_frame(df), max_reps=50)
+        for name, member in ensemble_members(bundle.model).items():
+            results[f"predict/{name}/{n}"] = measure(lambda: member.predict(X), max_reps=50)
+        results[f"predict/combined/{n}"] = measure(lambda: bundle.model.predict(X), max_reps=50)
+
+    from core.attributions import get_explainer
+    from core.what_if import what_if
+
+    profile = frame.iloc[0].to_dict()
+    results["predict/what_if"] = measure(lambda: what_if(profile, bundle), max_reps=50)
+    explainer = get_explainer(bundle)
+    results["predict/explain"] = measure(lambda: explainer.explain(profile))
+
+
+def bench_charts(results):
+    from core.charts import ChartCache, fig_to_base64, vehicle_distance_figure, vehicle_distance_png, waste_figure
+
+    results["charts/vehicle_distance"] = measure(lambda: fig_to_base64(vehicle_distance_figure(1200)), max_reps=30)
+    results["charts/waste"] = measure(lambda: fig_to_base64(waste_figure(4, 3)), max_reps=30)
+    cache = ChartCache()
+    results["charts/vehicle_distance_cached"] = measure(lambda: vehicle_distance_png(1200, cache=cache))
+
+
+def bench_pdf(results):
+    from core.report import render_html, render_pdf, render_text, sample_report
+
+    report = sample_report()
+    results["pdf/report"] = measure(lambda: render_pdf(report), max_reps=50)
+    results["pdf/report_html"] = measure(lambda: render_html(report))
+    results["pdf/report_text"] = measure(lambda: render_text(report))
+    print(f"pdf: {1000 / results['pdf/report']['p50_ms']:.1f} reports/sec", file=sys.stderr)
+
+
+def bench_feedback(results):
+    import pandas as pd
+
+    from core.feedback_rules import evaluate, evaluate_codes
+
+    rng = random.Random(0)
+    profiles = [schema.random_profile(rng) for _ in range(10_000)]
+    df = pd.DataFrame(profiles)
+    results["feedback/row"] = measure(lambda: evaluate(profiles[0]))
+    results["feedback/frame_10000"] = measure(lambda: evaluate_codes(df), max_reps=30)
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratio = current["p50_ms"] / previous["p50_ms"] if previous["p50_ms"] else 1.0
+        current["vs_baseline"] = ratio
+        if ratio > 1 + tolerance and current["p50_ms"] - previous["p50_ms"] > min_delta_ms:
+            regressions.append((name, previous["p50_ms"], current["p50_ms"], ratio))
+    return regressions
+
+
+def run(selected, bundle, batch_sizes):
+    results = {}
+    if "load" in selected:
+        bench_load(results)
+    if "encode" in selected:
+        bench_encode(results, load_pickles())  # the DataFrame pipeline needs the fitted preprocessor
+    if "predict" in selected:
+        bench_predict(results, bundle, batch_sizes)
+    if "charts" in selected:
+        bench_charts(results)
+    if "pdf" in selected:
+        bench_pdf(results)
+    if "feedback" in selected:
+        bench_feedback(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=None)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before flagging (default: 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore p50 slowdowns smaller than this many ms (default: 0.05)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Reruns of the suite to confirm flagged slowdowns (default: 3)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    selected = set(args.only or SUITES)
+    bundle = get_model_bundle()
+    results = run(selected, bundle, args.batch_sizes)
+
+    baseline = {}
+    if args.save_baseline:
+        runs = [results] + [run(selected, bundle, args.batch_sizes) for _ in range(args.retries)]
+        results = {name: sorted((r[name] for r in runs), key=lambda r: r["p50_ms"])[len(runs) // 2] for name in results}
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        # A shared machine has slow spells; a real regression shows in every run
+        rerun = run(selected, bundle, args.batch_sizes)
+        for name, *_ in regressions:
+            if rerun[name]["p50_ms"] < results[name]["p50_ms"]:
+                results[name] = rerun[name]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+
+    print(f"{'benchmark':<40} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9} {'vs base':>8}")
+    for name, r in results.items():
+        vs = f"{r['vs_baseline']:.2f}x" if "vs_baseline" in r else "-"
+        print(f"{name:<40} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['peak_mb']:>9.2f} {vs:>8}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "model_version": bundle.version, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for name, before, after, ratio in regressions:
+            print(f"  {name}: {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Versioned model artifact: a manifest plus each model in its native format.
+
+Usage:
+    python -m core.artifact export            # convert the pickles in models/ to models/artifact/
+    python -m core.artifact check             # verify models/artifact/, time its load and compare with the pickles
+
+An artifact directory holds ``manifest.json`` (format number, bundle version,
+feature order, dummy categories, the compiled FeatureEncoder, library versions,
+training metrics, and the SHA-256 of every other file) and one set of files per
+model, VotingRegressor members each getting their own:
+
+    <name>.ubj                  XGBoost, the booster's own binary format
+    <name>.lgbm.txt             LightGBM, the booster's model text
+    <name>.<field>.npy          scikit-learn trees as flat node arrays (memory-mapped on load)
+    <name>.coef.npy             linear models
+    <name>.pkl                  anything else
+
+Tree arrays are memory-mapped read-only, so every worker process serving the
+same artifact predicts against one copy of them in the page cache; set
+CARBON_MODEL_MEMORY=private to read them into each process's own memory
+instead (scripts/worker_memory.py compares the two).
+
+Loading fails with ArtifactError when the format is unknown, a file does not
+match its checksum, a model expects a different number of features than the
+feature order, or a pickled model was written by another major.minor version of
+its library; reading a native format written by a newer library only warns.
+No preprocessor pickle is needed: the bundle carries the encoder spec instead.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import time
+import warnings
+from types import MappingProxyType
+
+import numpy as np
+
+from core.features import get_feature_encoder
+from core.model_bundle import ARTIFACT_DIR, MANIFEST_FILE, MODEL_DIR, ModelBundle, load_pickles
+from core.tree_arrays import TREE_FIELDS, TreeEnsemble
+
+FORMAT = 1
+MEMORY_ENV = "CARBON_MODEL_MEMORY"
+
+# Import name -> distribution name, for reading versions without importing the library
+DISTRIBUTIONS = {"numpy": "numpy", "sklearn": "scikit-learn", "xgboost": "xgboost", "lightgbm": "lightgbm"}
+
+
+class ArtifactError(ValueError):
+    """The artifact on disk cannot be served as it is."""
+
+
+class LinearModel:
+    """``X @ coef_ + intercept_``, as a scikit-learn linear regressor predicts."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+        self.n_features_in_ = len(self.coef_)
+
+    def predict(self, X):
+        return X @ self.coef_ + self.intercept_
+
+
+class VotingEnsemble:
+    """A VotingRegressor's prediction, the weighted mean of its members, over members loaded from an artifact."""
+
+    def __init__(self, named_members, weights=None):
+        self.named_estimators_ = dict(named_members)
+        self.estimators_ = list(self.named_estimators_.values())
+        self.weights = weights
+        self.n_features_in_ = _n_features(self.estimators_[0])
+
+    def predict(self, X):
+        return np.average(np.column_stack([member.predict(X) for member in self.estimators_]), axis=1, weights=self.weights)
+
+
+def _library_version(name):
+    from importlib import metadata
+
+    try:
+        return metadata.version(DISTRIBUTIONS.get(name, name))
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _major_minor(version):
+    return tuple(int(part) for part in version.split(".")[:2] if part.isdigit())
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _n_features(model):
+    if hasattr(model, "n_features_in_"):
+        return int(model.n_features_in_)
+    return int(model.num_feature())  # lightgbm.Booster
+
+
+def _library(model):
+    return type(model).__module__.split(".")[0]
+
+
+def _is_trees(model):
+    return isinstance(model, TreeEnsemble) or (
+        _library(model) == "sklearn"
+        and (hasattr(model, "tree_") or type(model).__name__ in ("RandomForestRegressor", "ExtraTreesRegressor"))
+    )
+
+
+def is_linear(model):
+    return isinstance(model, LinearModel) or (
+        type(model).__module__.startswith("sklearn.linear_model")
+        and np.ndim(getattr(model, "coef_", None)) == 1
+        and np.ndim(getattr(model, "intercept_", None)) == 0
+    )
+
+
+# --- Writing ---
+def _save_member(model, name, out_dir):
+    """Write one model in its native format; returns its manifest entry."""
+    library = _library(model)
+    entry = {"name": name, "class": type(model).__name__, "n_features": _n_features(model)}
+    if library == "xgboost":
+        entry.update(kind="xgboost", files=[f"{name}.ubj"])
+        model.save_model(os.path.join(out_dir, f"{name}.ubj"))
+    elif library == "lightgbm":
+        entry.update(kind="lightgbm", files=[f"{name}.lgbm.txt"])
+        booster = getattr(model, "booster_", model)
+        booster.save_model(os.path.join(out_dir, f"{name}.lgbm.txt"))
+    elif _is_trees(model):
+        trees = model if isinstance(model, TreeEnsemble) else TreeEnsemble.from_sklearn(model)
+        library = "numpy"
+        entry.update(kind="trees", files=[f"{name}.{field}.npy" for field in TREE_FIELDS],
+                     roots=trees.roots.tolist(), max_depth=trees.max_depth)
+        for field, array in trees.arrays().items():
+            np.save(os.path.join(out_dir, f"{name}.{field}.npy"), np.ascontiguousarray(array))
+    elif is_linear(model):
+        library = "numpy"
+        entry.update(kind="linear", files=[f"{name}.coef.npy"], intercept=float(model.intercept_))
+        np.save(os.path.join(out_dir, f"{name}.coef.npy"), np.asarray(model.coef_, dtype=np.float64))
+    else:
+        entry.update(kind="pickle", files=[f"{name}.pkl"])
+        with open(os.path.join(out_dir, f"{name}.pkl"), "wb") as f:
+            pickle.dump(model, f)
+    entry.update(library=library, library_version=_library_version(library))
+    return entry
+
+
+def _save_model(model, out_dir):
+    named = getattr(model, "named_estimators_", None)
+    if named is None or not hasattr(model, "estimators_"):
+        return _save_member(model, "model", out_dir)
+    weights = getattr(model, "_weights_not_none", getattr(model, "weights", None))
+    return {
+        "kind": "voting",
+        "class": type(model).__name__,
+        "weights": None if weights is None else [float(w) for w in weights],
+        "members": [_save_member(member, name, out_dir) for name, member in named.items()],
+    }
+
+
+def export_artifact(bundle=None, out_dir=None, metrics=None):
+    """Write ``bundle`` (default: the pickles in models/) as an artifact directory; returns the manifest.
+
+    The directory is assembled next to the target and swapped in at the end, so
+    a reader never sees a half-written artifact.
+    """
+    bundle = bundle or load_pickles()
+    out_dir = out_dir or os.path.join(MODEL_DIR, ARTIFACT_DIR)
+    staging = f"{out_dir}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    model = _save_model(bundle.model, staging)
+    libraries = {"python": platform.python_version()}
+    libraries.update({name: v for name in DISTRIBUTIONS if (v := _library_version(name)) is not None})
+    manifest = {
+        "format": FORMAT,
+        "version": bundle.version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "feature_order": list(bundle.feature_order),
+        "categories": {column: list(categories) for column, categories in bundle.dummy_info.items()},
+        "encoder": get_feature_encoder(bundle).to_spec(),
+        "libraries": libraries,
+        "metrics": metrics,
+        "model": model,
+        "files": {name: _sha256(os.path.join(staging, name)) for name in sorted(os.listdir(staging))},
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(staging, out_dir)
+    return manifest
+
+
+# --- Reading ---
+def _check_library(entry):
+    installed = _library_version(entry["library"])
+    if installed is None:
+        raise ArtifactError(f"model {entry['name']!r} needs {entry['library']}, which is not installed")
+    written = entry["library_version"]
+    if entry["kind"] == "pickle" and _major_minor(installed) != _major_minor(written):
+        raise ArtifactError(
+            f"model {entry['name']!r} was pickled with {entry['library']} {written}; {installed} is installed"
+        )
+    if _major_minor(installed) < _major_minor(written):
+        warnings.warn(f"model {entry['name']!r} was written by {entry['library']} {written}; {installed} is installed")
+
+
+def _load_member(entry, path, mmap_mode):
+    _check_library(entry)
+    files = [os.path.join(path, name) for name in entry["files"]]
+    kind = entry["kind"]
+    if kind == "xgboost":
+        from xgboost import XGBRegressor
+
+        model = XGBRegressor()
+        model.load_model(files[0])
+    elif kind == "lightgbm":
+        import lightgbm
+
+        model = lightgbm.Booster(model_file=files[0])
+    elif kind == "trees":
+        arrays = {field: np.load(file, mmap_mode=mmap_mode) for field, file in zip(TREE_FIELDS, files)}
+        model = TreeEnsemble(arrays, entry["roots"], entry["max_depth"], entry["n_features"])
+    elif kind == "linear":
+        model = LinearModel(np.load(files[0]), entry["intercept"])
+    elif kind == "pickle":
+        with open(files[0], "rb") as f:
+            model = pickle.load(f)
+    else:
+        raise ArtifactError(f"model {entry['name']!r} has unknown kind {kind!r}")
+    return model
+
+
+def read_manifest(path=None):
+    path = path or os.path.join(MODEL_DIR, ARTIFACT_DIR)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_artifact(path=None, verify=True, shared=None):
+    """Load an artifact directory as a ModelBundle (``preprocessor`` is None; ``encoder_spec`` is set).
+
+    With ``shared`` (default: unless CARBON_MODEL_MEMORY=private) tree arrays
+    are memory-mapped instead of read into this process.
+    """
+    if shared is None:
+        shared = os.environ.get(MEMORY_ENV, "shared").lower() != "private"
+    path = path or os.path.join(MODEL_DIR, ARTIFACT_DIR)
+    manifest = read_manifest(path)
+    if manifest.get("format") != FORMAT:
+        raise ArtifactError(f"{path} is artifact format {manifest.get('format')}; this code reads format {FORMAT}")
+    if verify:
+        for name, digest in manifest["files"].items():
+            if _sha256(os.path.join(path, name)) != digest:
+                raise ArtifactError(f"{name} in {path} does not match its checksum in the manifest")
+
+    feature_order = tuple(manifest["feature_order"])
+    if tuple(manifest["encoder"]["feature_order"]) != feature_order:
+        raise ArtifactError("the encoder in the manifest was compiled for a different feature order")
+
+    spec = manifest["model"]
+    entries = spec["members"] if spec["kind"] == "voting" else [spec]
+    members = {}
+    for entry in entries:
+        model = _load_member(entry, path, "r" if shared else None)
+        if _n_features(model) != len(feature_order):
+            raise ArtifactError(
+                f"model {entry['name']!r} expects {_n_features(model)} features; the feature order has {len(feature_order)}"
+            )
+        members[entry["name"]] = model
+    model = VotingEnsemble(members, spec["weights"]) if spec["kind"] == "voting" else members[spec["name"]]
+
+    return ModelBundle(
+        model=model,
+        preprocessor=None,
+        dummy_info=MappingProxyType({column: tuple(categories) for column, categories in manifest["categories"].items()}),
+        feature_order=feature_order,
+        version=manifest["version"],
+        encoder_spec=manifest["encoder"],
+    )
+
+
+def main(argv=None):
+    from core import schema
+
+    parser = argparse.ArgumentParser(description="Export the model pickles to the versioned artifact format, or check it.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--path", default=None, help=f"Artifact directory (default: models/{ARTIFACT_DIR})")
+    parser.add_argument("--metrics", default=None, help="JSON file of training metrics to record when exporting")
+    parser.add_argument("--profiles", type=int, default=10_000, help="Random profiles to compare predictions on")
+    args = parser.parse_args(argv)
+
+    path = args.path or os.path.join(MODEL_DIR, ARTIFACT_DIR)
+    if args.command == "export":
+        metrics = None
+        if args.metrics:
+            with open(args.metrics) as f:
+                metrics = json.load(f)
+        manifest = export_artifact(out_dir=path, metrics=metrics)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in manifest["files"])
+        print(f"Wrote bundle {manifest['version']} to {path}: {len(manifest['files'])} files, {size:,} bytes")
+
+    start = time.perf_counter()
+    pickled = load_pickles()
+    pickle_s = time.perf_counter() - start
+    start = time.perf_counter()
+    bundle = load_artifact(path)
+    artifact_s = time.perf_counter() - start
+
+    import pandas as pd
+
+    rng = random.Random(0)
+    frame = pd.DataFrame([schema.random_profile(rng) for _ in range(args.profiles)])
+    expected = pickled.model.predict(get_feature_encoder(pickled).encode_frame(frame))
+    actual = bundle.model.predict(get_feature_encoder(bundle).encode_frame(frame))
+    print(f"Artifact {bundle.version} ({'matches' if bundle.version == pickled.version else 'differs from'} the pickles): "
+          f"loaded and verified in {artifact_s * 1000:.0f} ms (pickles {pickle_s * 1000:.0f} ms)")
+    print(f"Max prediction difference on {args.profiles:,} profiles: {np.abs(actual - expected).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
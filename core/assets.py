@@ -0,0 +1,122 @@
+"""Page background and CSS shared by the app's pages.
+
+Regenerate the statically served background after changing the source image:
+    python -m core.assets
+
+The app serves the committed static/background.webp as it is and never writes
+it, so checkouts and read-only deploys are left untouched.
+"""
+import argparse
+import base64
+import functools
+import hashlib
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKGROUND_IMAGE = os.path.join(ROOT, "Images", "background_min.jpg")
+
+# Files here are served by Streamlit at app/static/<name> when
+# server.enableStaticServing is on (see .streamlit/config.toml)
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_BACKGROUND = os.path.join(STATIC_DIR, "background.webp")
+STATIC_BACKGROUND_MAX_WIDTH = 1920
+
+PAGE_CSS = """
+<style>
+[data-testid="stAppViewContainer"] {{
+    background-image: url("{background_url}");
+    background-size: cover;
+    background-position: center;
+    background-repeat: no-repeat;
+}}
+
+.container {{
+    background-color: rgba(255, 255, 255, 0.85);
+    padding: 3rem;
+    border-radius: 20px;
+    margin: auto;
+    max-width: 900px;
+    font-family: 'Arial', sans-serif;
+    color: #333;
+}}
+
+[data-testid="stSidebar"] {{
+    background-color: black;
+    color: #333;
+}}
+</style>
+"""
+
+
+# Function to get base64 string of the image (read and encoded once per process)
+@functools.lru_cache(maxsize=None)
+def get_base64(file_path):
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return base64.b64encode(data).decode()
+
+
+def build_static_background(source=BACKGROUND_IMAGE, target=STATIC_BACKGROUND, max_width=STATIC_BACKGROUND_MAX_WIDTH):
+    """Write a resized WebP copy of the background for static serving; returns its path."""
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        tmp = f"{target}.tmp"
+        image.save(tmp, format="WEBP", quality=80, method=6)
+    os.replace(tmp, target)
+    return target
+
+
+def _static_serving_enabled():
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def _static_background_url():
+    with open(STATIC_BACKGROUND, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:8]
+    # The version query string changes whenever the image does, so browsers can keep it cached
+    return f"app/static/{os.path.basename(STATIC_BACKGROUND)}?v={version}"
+
+
+def background_url(static=None):
+    """URL for the page background: a static file if Streamlit serves them, else an inline data URI."""
+    if static is None:
+        static = _static_serving_enabled()
+    if static:
+        try:
+            return _static_background_url()
+        except OSError:
+            pass  # static/background.webp missing: fall back to inlining
+    return f"data:image/jpeg;base64,{get_base64(BACKGROUND_IMAGE)}"
+
+
+def page_background_css(static=None):
+    return PAGE_CSS.format(background_url=background_url(static))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate static/background.webp from the source background image.")
+    parser.add_argument("--max-width", type=int, default=STATIC_BACKGROUND_MAX_WIDTH,
+                        help=f"Resize wider images to this width (default: {STATIC_BACKGROUND_MAX_WIDTH})")
+    args = parser.parse_args(argv)
+
+    build_static_background(max_width=args.max_width)
+    inline = len(page_background_css(static=False).encode())
+    served = len(page_background_css(static=True).encode())
+    print(f"CSS sent per rerun, inline base64 image: {inline:,} bytes")
+    print(f"CSS sent per rerun, static file URL:     {served:,} bytes")
+    print(f"Static image ({STATIC_BACKGROUND}): {os.path.getsize(STATIC_BACKGROUND):,} bytes, "
+          f"fetched once per browser (was {os.path.getsize(BACKGROUND_IMAGE):,} bytes inline on every rerun)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Per-prediction feature attributions for the scoring model.
+
+Usage:
+    python -m core.attributions       # explain the sample report's profile and time it
+
+Each ensemble member is explained with the cheapest exact-for-its-kind method:
+
+* XGBoost and LightGBM: the libraries' own TreeSHAP (``pred_contribs`` /
+  ``pred_contrib``);
+* scikit-learn forests and trees: Saabas path attribution, from one
+  ``decision_path`` call and a per-model node-to-feature matrix built once
+  (forests loaded from an artifact as node arrays walk their own paths);
+* linear models: ``coef * (x - background mean)``;
+* anything else: the change from swapping each feature for its background mean;
+* the lookup table: the change from swapping each answer for the average over
+  that field's options (its knots for numeric fields).
+
+A VotingRegressor's attribution is the weighted mean of its members'. The
+background (random profiles of the tracker's input space) and the per-model
+tree matrices are computed once per bundle version. Contributions are then
+summed from encoded features back to the input fields the user answered.
+``explain`` attributes whichever of these CARBON_MODEL_MODE actually serves the
+prediction from, so the baseline and contributions add up to the number shown.
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from core import schema
+from core.fast_path import select_model
+from core.features import get_feature_encoder
+from core.lookup_table import select_table
+from core.model_bundle import get_model_bundle
+from core.tree_arrays import TreeEnsemble
+
+BACKGROUND_SIZE = 2_000
+
+
+class Explanation(NamedTuple):
+    prediction: float
+    baseline: float  # what the model predicts with no information about the profile
+    fields: list  # [(input field, contribution), ...], largest magnitude first
+
+    def top(self, n):
+        return self.fields[:n]
+
+
+def _is_module(model, name):
+    return type(model).__module__.split(".")[0] == name
+
+
+def _forest_matrix(model):
+    """Sparse (total nodes x features) matrix: the value change at each node, in its parent's split feature column."""
+    from scipy import sparse
+
+    trees = [model] if hasattr(model, "tree_") else list(model.estimators_)
+    rows, cols, data = [], [], []
+    offset = 0
+    roots = []
+    for tree in trees:
+        t = tree.tree_
+        value = t.value[:, 0, 0] if t.value.ndim == 3 else t.value[:, 0]
+        roots.append(value[0])
+        for parent in np.flatnonzero(t.children_left >= 0):
+            for child in (t.children_left[parent], t.children_right[parent]):
+                rows.append(offset + child)
+                cols.append(t.feature[parent])
+                data.append(value[child] - value[parent])
+        offset += t.node_count
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(offset, model.n_features_in_))
+    return matrix / len(trees), float(np.mean(roots))
+
+
+class Explainer:
+    """Attribution of one model (the bundle's unless given) over the bundle's encoding; built by ``get_explainer``."""
+
+    def __init__(self, bundle, model=None, background_size=BACKGROUND_SIZE):
+        import pandas as pd
+
+        self.encoder = get_feature_encoder(bundle)
+        self.model = bundle.model if model is None else model
+        self.version = bundle.version
+        rng = random.Random(0)
+        background = self.encoder.encode_frame(
+            pd.DataFrame([schema.random_profile(rng) for _ in range(background_size)])
+        )
+        self.background_mean = background.mean(axis=0)
+        self._forests = {}
+
+        # Encoded slot -> index of the input field it came from
+        self.fields = list(schema.INPUT_COLUMNS)
+        field_index = {field: i for i, field in enumerate(self.fields)}
+        self.slot_field = np.full(self.encoder.n_features, -1, dtype=np.intp)
+        for column, slot, _ in self.encoder.ordinal:
+            if slot is not None:
+                self.slot_field[slot] = field_index[column]
+        for column, slots in self.encoder.onehot + self.encoder.multilabel:
+            for slot in slots.values():
+                if slot is not None:
+                    self.slot_field[slot] = field_index[column]
+        for column, slot in self.encoder.numeric:
+            if slot is not None:
+                self.slot_field[slot] = field_index[column]
+
+        members = getattr(self.model, "estimators_", None)
+        if members is not None and hasattr(self.model, "named_estimators_"):
+            weights = getattr(self.model, "weights", None)
+            weights = np.ones(len(members)) if weights is None else np.asarray(weights, dtype=np.float64)
+            self.members = list(zip(members, weights / weights.sum()))
+        else:
+            self.members = [(self.model, 1.0)]
+        for member, _ in self.members:
+            if hasattr(member, "tree_") or (hasattr(member, "estimators_") and hasattr(member, "decision_path")):
+                self._forests[id(member)] = _forest_matrix(member)
+
+    def _member_contributions(self, member, X):
+        """``(contributions (n x features), bias (n,))`` with ``contributions.sum(1) + bias == member.predict(X)``."""
+        if _is_module(member, "xgboost"):
+            import xgboost
+
+            out = member.get_booster().predict(xgboost.DMatrix(X), pred_contribs=True)
+            return out[:, :-1], out[:, -1]
+        if _is_module(member, "lightgbm"):
+            out = np.asarray(member.predict(X, pred_contrib=True))
+            return out[:, :-1], out[:, -1]
+        if isinstance(member, TreeEnsemble):
+            return member.contributions(X)
+        if id(member) in self._forests:
+            matrix, root = self._forests[id(member)]
+            indicator = member.decision_path(X)
+            indicator = indicator[0] if isinstance(indicator, tuple) else indicator
+            return np.asarray((indicator @ matrix).todense()), np.full(len(X), root)
+        if hasattr(member, "coef_") and hasattr(member, "intercept_"):
+            coef = np.ravel(member.coef_)
+            bias = float(np.ravel(member.intercept_)[0]) + float(coef @ self.background_mean)
+            return (X - self.background_mean) * coef, np.full(len(X), bias)
+
+        # Occlusion: one batch with each feature in turn set to its background mean
+        n, d = X.shape
+        swapped = np.repeat(X, d, axis=0)
+        columns = np.tile(np.arange(d), n)
+        swapped[np.arange(n * d), columns] = self.background_mean[columns]
+        full = member.predict(X)
+        contributions = full[:, None] - member.predict(swapped).reshape(n, d)
+        return contributions, full - contributions.sum(axis=1)
+
+    def contributions(self, X):
+        """Encoded-feature contributions and bias of the whole model for each row of ``X``."""
+        total = np.zeros_like(X, dtype=np.float64)
+        bias = np.zeros(len(X))
+        for member, weight in self.members:
+            contributions, member_bias = self._member_contributions(member, X)
+            total += weight * contributions
+            bias += weight * member_bias
+        return total, bias
+
+    def explain_rows(self, X):
+        """One Explanation per row of an encoded matrix, from a single pass over the model."""
+        contributions, bias = self.contributions(X)
+        known = self.slot_field >= 0
+        explanations = []
+        for row, row_bias in zip(contributions, bias):
+            by_field = np.bincount(self.slot_field[known], weights=row[known], minlength=len(self.fields))
+            explanations.append(Explanation(
+                prediction=float(row_bias + row.sum()),
+                baseline=float(row_bias),
+                fields=sorted(zip(self.fields, by_field.tolist()), key=lambda item: abs(item[1]), reverse=True),
+            ))
+        return explanations
+
+    def explain(self, input_data):
+        return self.explain_rows(self.encoder.encode(input_data))[0]
+
+    def explain_frame(self, df):
+        return self.explain_rows(self.encoder.encode_frame(df))
+
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(bundle, model=None, tag=None):
+    """Build (once per ``tag``, default the bundle version) and return the Explainer for ``model``."""
+    tag = tag or bundle.version
+    with _explainers_lock:
+        explainer = _explainers.get(tag)
+        if explainer is None:
+            explainer = Explainer(bundle, model)
+            _explainers.clear()
+            _explainers[tag] = explainer
+        return explainer
+
+
+def explain_table(lookup, input_data):
+    """Explanation of a lookup table's prediction, or None when input_data falls outside the table."""
+    prediction = lookup.predict(input_data)
+    if prediction is None:
+        return None
+    alternatives = {column: options for column, options, _ in lookup.meta["fields"]}
+    alternatives.update({column: knots for column, knots, _ in lookup.meta["axes"]})
+    for column, offsets in lookup.meta["flags"]:
+        alternatives[column] = [list(subset) for n in range(len(offsets) + 1)
+                                for subset in itertools.combinations(offsets, n)]
+    fields = []
+    for field in schema.INPUT_COLUMNS:
+        swapped = [lookup.predict(dict(input_data, **{field: value})) for value in alternatives.get(field, [])]
+        swapped = [value for value in swapped if value is not None]
+        fields.append((field, prediction - float(np.mean(swapped)) if swapped else 0.0))
+    return Explanation(
+        prediction=prediction,
+        baseline=prediction - sum(contribution for _, contribution in fields),
+        fields=sorted(fields, key=lambda item: abs(item[1]), reverse=True),
+    )
+
+
+def explain(input_data, bundle=None):
+    """Explanation of the prediction ``predict_profile`` serves for one input_data dict.
+
+    That is the lookup table's or the fast-path model's when CARBON_MODEL_MODE
+    selects (and its gate allows) them, otherwise the bundle's model.
+    """
+    bundle = bundle or get_model_bundle()
+    lookup = select_table(bundle)
+    if lookup is not None:
+        explanation = explain_table(lookup, input_data)
+        if explanation is not None:
+            return explanation
+    return get_explainer(bundle, *select_model(bundle)).explain(input_data)
+
+
+def main(argv=None):
+    from core.report import SAMPLE_PROFILE
+
+    parser = argparse.ArgumentParser(description="Explain the sample profile's prediction and time the explanation.")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    bundle = get_model_bundle()
+    start = time.perf_counter()
+    explainer = get_explainer(bundle)
+    setup = time.perf_counter() - start
+    explanation = explainer.explain(SAMPLE_PROFILE)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        explainer.explain(SAMPLE_PROFILE)
+    per_call = (time.perf_counter() - start) / args.repeat
+
+    predicted = float(bundle.model.predict(get_feature_encoder(bundle).encode(SAMPLE_PROFILE))[0])
+    print(f"Prediction {predicted:.2f} = baseline {explanation.baseline:.2f} + contributions "
+          f"(sum {explanation.prediction - explanation.baseline:+.2f}; additivity error "
+          f"{abs(explanation.prediction - predicted):.2e})")
+    for field, contribution in explanation.fields:
+        print(f"  {contribution:>+9.2f}  {schema.FIELD_LABELS[field]}")
+    print(f"Background and tree matrices built in {setup * 1000:.0f} ms; {per_call * 1000:.2f} ms per explanation")
+
+
+if __name__ == "__main__":
+    main()
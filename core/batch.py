@@ -0,0 +1,150 @@
+"""Bulk carbon-footprint scoring for survey exports.
+
+Usage:
+    python -m core.batch "Carbon Emission.csv" predictions.csv
+    python -m core.batch survey.parquet predictions.parquet --chunksize 100000
+    python -m core.batch survey.csv predictions.csv --feedback   # add the dashboard feedback per row
+
+Rows are scored like the app scores a profile: from the lookup table when
+CARBON_MODEL_MODE=table serves one (see core.lookup_table), otherwise by the model.
+"""
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core import schema
+from core.fast_path import select_model
+from core.feedback_rules import evaluate_frame
+from core.features import get_feature_encoder
+from core.lookup_table import select_table
+from core.model_bundle import get_model_bundle
+
+PREDICTION_COLUMN = "predicted_carbon_emission"
+
+
+@dataclass
+class BatchReport:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def normalize_columns(df):
+    """Accept either the snake_case input columns or the raw survey export header."""
+    if all(column in df.columns for column in schema.INPUT_COLUMNS):
+        return df
+    if len(df.columns) in (len(schema.SURVEY_COLUMNS), len(schema.SURVEY_COLUMNS) - 1):
+        # Same positional rename the training notebook applies (target column optional)
+        return df.set_axis(schema.SURVEY_COLUMNS[:len(df.columns)], axis=1)
+    missing = [column for column in schema.INPUT_COLUMNS if column not in df.columns]
+    raise ValueError(f"Input is missing columns: {missing}")
+
+
+def iter_chunks(path, chunksize):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson"):
+        with pd.read_json(path, lines=True, chunksize=chunksize) as reader:
+            yield from reader
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class _ChunkWriter:
+    """Appends scored chunks to CSV or Parquet without holding earlier chunks in memory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_frame(df, bundle=None):
+    """Predict every row of an input DataFrame; returns a NumPy array."""
+    bundle = bundle or get_model_bundle()
+    df = normalize_columns(df)
+    lookup = select_table(bundle)
+    if lookup is None:
+        return select_model(bundle)[0].predict(get_feature_encoder(bundle).encode_frame(df))
+    # Same order as predict_profile: the table where it covers the row, the model for the rest
+    predictions = np.array([lookup.predict(record) for record in df[schema.INPUT_COLUMNS].to_dict("records")], dtype=float)
+    missed = np.isnan(predictions)
+    if missed.any():
+        predictions[missed] = select_model(bundle)[0].predict(get_feature_encoder(bundle).encode_frame(df[missed]))
+    return predictions
+
+
+def score_file(input_path, output_path, chunksize=50_000, bundle=None, log=None, feedback=False):
+    """Stream ``input_path`` through :func:`score_frame` chunk by chunk, writing to ``output_path``.
+
+    With ``feedback`` each row also gets the dashboard's feedback level and message per rule.
+    """
+    bundle = bundle or get_model_bundle()
+    writer = _ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            chunk = normalize_columns(chunk)
+            chunk[PREDICTION_COLUMN] = score_frame(chunk, bundle)
+            if feedback:
+                chunk = chunk.join(evaluate_frame(chunk))
+            writer.write(chunk)
+            rows += len(chunk)
+            if log:
+                elapsed = time.perf_counter() - start
+                log(f"{rows:,} rows scored ({rows / elapsed:,.0f} rows/sec)")
+    finally:
+        writer.close()
+    return BatchReport(rows=rows, seconds=time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a survey export (CSV or Parquet) with the carbon footprint model.")
+    parser.add_argument("input", help="CSV or Parquet file with the survey columns")
+    parser.add_argument("output", help="Destination CSV or Parquet file (format chosen by extension)")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk (default: 50000)")
+    parser.add_argument("--feedback", action="store_true", help="Add the dashboard feedback level and message columns")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda message: print(message, file=sys.stderr))
+    report = score_file(args.input, args.output, chunksize=args.chunksize, log=log, feedback=args.feedback)
+    print(f"Scored {report.rows:,} rows in {report.seconds:.2f}s ({report.rows_per_sec:,.0f} rows/sec) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
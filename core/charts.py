@@ -0,0 +1,145 @@
+import base64
+import io
+import threading
+from collections import OrderedDict
+
+# st.pyplot's resolution, so the cached PNGs look like the old inline figures
+DPI = 200
+
+
+def _pyplot():
+    # matplotlib costs a few hundred ms to import; pay it on the first chart, not on import
+    import matplotlib
+    matplotlib.use("Agg")  # server-side rendering only; never open a GUI window
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+# Improved Vehicle Distance Graph
+def vehicle_distance_figure(vehicle_distance):
+    fig, ax = _pyplot().subplots(figsize=(4, 4))
+    ax.bar(['Monthly Travel by Person'], [vehicle_distance], color='green', width=0.5)
+    ax.set_ylabel("Distance Travelled (km)")
+    ax.set_title("Distance Travel by Person Via Vehicle")
+    ax.set_ylim(0, max(vehicle_distance * 1.2, 100))  # Set a reasonable y-limit
+    return fig
+
+
+def waste_figure(waste_bag_count, recycling_count):
+    fig, ax = _pyplot().subplots()
+    ax.bar(['Waste Bags per Week', 'Recycling Materials'], [waste_bag_count, recycling_count], color=['orange', 'lightgreen'])
+    ax.set_ylabel("Count")
+    ax.set_title("Waste and Recycling Overview")
+    return fig
+
+
+def contributions_figure(labels, values):
+    fig, ax = _pyplot().subplots(figsize=(6, 0.45 * len(labels) + 1.2))
+    ax.barh(labels[::-1], values[::-1], color=['tomato' if v > 0 else 'seagreen' for v in values[::-1]])
+    ax.axvline(0, color='black', linewidth=0.8)
+    ax.set_xlabel("Effect on Your Estimate (units)")
+    ax.set_title("What Drives Your Estimate")
+    return fig
+
+
+def fig_to_png(fig):
+    """Render a figure to PNG bytes in memory and close it."""
+    from PIL import Image
+
+    try:
+        # Lay out once and draw once; savefig(bbox_inches="tight") would draw twice
+        fig.set_dpi(DPI)
+        fig.tight_layout()
+        fig.canvas.draw()
+        size = fig.canvas.get_width_height(physical=True)
+        image = Image.frombuffer("RGBA", size, fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        # Flat bar charts fit a 256-colour palette: half the bytes of RGBA, and the
+        # PDF writer embeds a palette image several times faster
+        image = image.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE)
+    finally:
+        _pyplot().close(fig)
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def png_data_uri(png):
+    return f"data:image/png;base64,{base64.b64encode(png).decode()}"
+
+
+# Save matplotlib figure as base64 image
+def fig_to_base64(fig):
+    return png_data_uri(fig_to_png(fig))
+
+
+class ChartCache:
+    """Thread-safe LRU of rendered chart PNGs keyed on the plotted values.
+
+    Bounded by the total size of the stored images rather than their count.
+    """
+
+    def __init__(self, max_bytes=16 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, build_figure):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        # pyplot's figure registry is global, so render outside the lock but one at a time
+        with _render_lock:
+            png = fig_to_png(build_figure())
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = png
+                self._bytes += len(png)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_render_lock = threading.Lock()
+chart_cache = ChartCache()
+
+
+def vehicle_distance_png(vehicle_distance, cache=chart_cache):
+    return cache.get_or_render(("vehicle_distance", vehicle_distance), lambda: vehicle_distance_figure(vehicle_distance))
+
+
+def waste_png(waste_bag_count, recycling_count, cache=chart_cache):
+    return cache.get_or_render(("waste", waste_bag_count, recycling_count), lambda: waste_figure(waste_bag_count, recycling_count))
+
+
+def contributions_png(labels, values, cache=chart_cache):
+    values = [round(v, 1) for v in values]
+    return cache.get_or_render(("contributions", tuple(labels), tuple(values)), lambda: contributions_figure(labels, values))
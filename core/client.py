@@ -0,0 +1,23 @@
+import json
+import os
+import urllib.request
+
+# Point the Streamlit pages at a running `python -m core.service` instead of the local model
+API_URL_ENV = "CARBON_API_URL"
+
+
+def service_url():
+    return os.environ.get(API_URL_ENV, "").rstrip("/") or None
+
+
+def predict_via_service(input_data, url=None, timeout=10.0):
+    """POST one input_data dict to the prediction service; returns the prediction as a float."""
+    url = url or service_url()
+    request = urllib.request.Request(
+        f"{url}/predict",
+        data=json.dumps(input_data).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return float(json.loads(response.read())["prediction"])
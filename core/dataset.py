@@ -0,0 +1,35 @@
+import pandas as pd
+
+from core.batch import normalize_columns
+
+TARGET = 'carbon_emission'
+RANDOM_STATE = 42
+
+
+def load_survey(path):
+    """Read the raw survey export and apply the notebook's column names."""
+    df = pd.read_csv(path) if not str(path).endswith((".parquet", ".pq")) else pd.read_parquet(path)
+    return normalize_columns(df)
+
+
+def clean_survey(df):
+    """Same cleaning as CarbonMajor.ipynb: drop vehicle_type, trim distance outliers, cap counts."""
+    df = df.drop(columns=['vehicle_type'], errors='ignore')
+
+    Q1 = df['vehicle_monthly_distance_km'].quantile(0.25)
+    Q3 = df['vehicle_monthly_distance_km'].quantile(0.75)
+    upper_bound = Q3 + 1.5 * (Q3 - Q1)
+    df = df[df['vehicle_monthly_distance_km'] < upper_bound].copy()
+
+    df['new_clothes_monthly'] = df['new_clothes_monthly'].clip(upper=25)
+    df['tv_pc_daily_hours'] = df['tv_pc_daily_hours'].clip(upper=16)
+    df['internet_daily_hours'] = df['internet_daily_hours'].clip(upper=16)
+    return df
+
+
+def split_survey(df, test_size=0.2, random_state=RANDOM_STATE):
+    from sklearn.model_selection import train_test_split
+
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET]
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
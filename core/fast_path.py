@@ -0,0 +1,146 @@
+"""Distilled fast-path model with an accuracy gate in front of it.
+
+Train (needs the survey export used by CarbonMajor.ipynb):
+    python -m core.fast_path "Carbon Emission.csv"
+
+Serve with it by setting CARBON_MODEL_MODE=fast. The compact model is only used
+when it was distilled from the currently loaded ensemble and its recorded
+deviation from that ensemble is within CARBON_FAST_MAX_DEVIATION (relative mean
+absolute deviation, default 0.02); otherwise every caller gets the full ensemble.
+"""
+import argparse
+import os
+import pickle
+import random
+import threading
+import warnings
+
+import numpy as np
+
+from core import schema
+from core.features import get_feature_encoder
+from core.model_bundle import MODEL_DIR, get_model_bundle
+
+FAST_MODEL_FILE = "fast_model.pkl"
+MODE_ENV = "CARBON_MODEL_MODE"
+MAX_DEVIATION_ENV = "CARBON_FAST_MAX_DEVIATION"
+DEFAULT_MAX_DEVIATION = 0.02
+
+_fast_models = {}
+_lock = threading.Lock()
+
+
+def deviation_report(teacher, student):
+    deviation = np.abs(np.asarray(student) - np.asarray(teacher))
+    return {
+        "max_abs_deviation": float(deviation.max()),
+        "mean_abs_deviation": float(deviation.mean()),
+        "relative_mean_deviation": float(deviation.mean() / np.abs(teacher).mean()),
+    }
+
+
+def distill(survey_path, bundle=None, n_synthetic=50_000, out_path=None, log=print):
+    """Fit a small gradient-boosted model to the ensemble's outputs and save it next to it."""
+    import pandas as pd
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from sklearn.metrics import r2_score
+
+    from core.dataset import clean_survey, load_survey, split_survey
+
+    bundle = bundle or get_model_bundle()
+    encoder = get_feature_encoder(bundle)
+    teacher = bundle.model
+
+    X_train, X_test, y_train, y_test = split_survey(clean_survey(load_survey(survey_path)))
+    X_train = encoder.encode_frame(X_train)
+    X_test = encoder.encode_frame(X_test)
+
+    # The app can reach profiles the survey never contained, so add uniform samples of the input space
+    rng = random.Random(0)
+    synthetic = encoder.encode_frame(pd.DataFrame([schema.random_profile(rng) for _ in range(n_synthetic)]))
+    X_fit = np.vstack([X_train, synthetic])
+    y_fit = teacher.predict(X_fit)
+
+    log(f"Distilling on {len(X_fit):,} rows ({n_synthetic:,} synthetic)")
+    student = HistGradientBoostingRegressor(max_iter=300, max_leaf_nodes=31, learning_rate=0.1, random_state=42)
+    student.fit(X_fit, y_fit)
+
+    teacher_test = teacher.predict(X_test)
+    student_test = student.predict(X_test)
+    metrics = deviation_report(teacher_test, student_test)
+    metrics["teacher_r2"] = float(r2_score(y_test, teacher_test))
+    metrics["student_r2"] = float(r2_score(y_test, student_test))
+    metrics.update({f"synthetic_{k}": v for k, v in deviation_report(y_fit[len(X_train):], student.predict(synthetic)).items()})
+
+    artifact = {
+        "model": student,
+        "teacher_version": bundle.version,
+        "feature_order": bundle.feature_order,
+        "metrics": metrics,
+    }
+    out_path = out_path or os.path.join(MODEL_DIR, FAST_MODEL_FILE)
+    with open(out_path, "wb") as f:
+        pickle.dump(artifact, f)
+    return metrics
+
+
+def _load_fast_model(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _lock:
+        artifact = _fast_models.get(key)
+        if artifact is None:
+            with open(path, "rb") as f:
+                artifact = pickle.load(f)
+            _fast_models.clear()
+            _fast_models[key] = artifact
+        return artifact
+
+
+def fast_path_enabled():
+    return os.environ.get(MODE_ENV, "full").lower() == "fast"
+
+
+def select_model(bundle, model_dir=MODEL_DIR):
+    """Return ``(model, cache_tag)`` for scoring: the distilled model if allowed, else the ensemble.
+
+    ``cache_tag`` differs between the two so cached predictions never cross over.
+    """
+    if not fast_path_enabled():
+        return bundle.model, bundle.version
+
+    path = os.path.join(model_dir, FAST_MODEL_FILE)
+    if not os.path.exists(path):
+        warnings.warn(f"{MODE_ENV}=fast but {path} does not exist; using the full ensemble")
+        return bundle.model, bundle.version
+
+    artifact = _load_fast_model(path)
+    limit = float(os.environ.get(MAX_DEVIATION_ENV, DEFAULT_MAX_DEVIATION))
+    if artifact["teacher_version"] != bundle.version:
+        warnings.warn("fast-path model was distilled from a different ensemble; using the full ensemble")
+        return bundle.model, bundle.version
+    if artifact["metrics"]["relative_mean_deviation"] > limit:
+        warnings.warn(
+            f"fast-path model deviates {artifact['metrics']['relative_mean_deviation']:.2%} from the "
+            f"ensemble (limit {limit:.2%}); using the full ensemble"
+        )
+        return bundle.model, bundle.version
+    return artifact["model"], f"{bundle.version}:fast"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distill the ensemble into a compact fast-path model.")
+    parser.add_argument("survey", help="Survey export (CSV or Parquet) with carbon_emission labels")
+    parser.add_argument("--synthetic", type=int, default=50_000, help="Uniform input-space samples to add (default: 50000)")
+    parser.add_argument("--output", default=None, help=f"Where to write the model (default: models/{FAST_MODEL_FILE})")
+    args = parser.parse_args(argv)
+
+    metrics = distill(args.survey, n_synthetic=args.synthetic, out_path=args.output)
+    print("Deviation from the ensemble on the test split:")
+    print(f"  max  {metrics['max_abs_deviation']:.2f} units")
+    print(f"  mean {metrics['mean_abs_deviation']:.2f} units ({metrics['relative_mean_deviation']:.2%})")
+    print(f"R² vs labels: ensemble {metrics['teacher_r2']:.4f}, fast path {metrics['student_r2']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import itertools
+import random
+import threading
+import warnings
+
+import numpy as np
+
+from core import schema
+from core.multilabel import MultiLabelEncoder, parse_multilabel
+
+ORDINAL_COLS = ['body_type', 'shower_frequency', 'social_activity', 'air_travel_frequency', 'waste_bag_size', 'energy_efficiency']
+ONEHOT_COLS = ['gender', 'diet', 'heating_energy_source', 'transport']
+MULTILABEL_COLS = ['recycling', 'cooking_with']
+
+# The model was fitted on a DataFrame; we feed it arrays already in feature_order.
+warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+
+
+def _fitted_columns(preprocessor, name):
+    for transformer_name, _, columns in preprocessor.transformers_:
+        if transformer_name == name:
+            return list(columns)
+    raise KeyError(f"preprocessor has no '{name}' transformer")
+
+
+class FeatureEncoder:
+    """Maps an input_data dict straight to a model-ready row in feature_order.
+
+    Compiled once from the fitted ColumnTransformer, dummy categories and feature
+    order; produces exactly what the DataFrame pipeline (``legacy_transform``)
+    produces, without building any DataFrame.
+    """
+
+    def __init__(self, bundle):
+        preprocessor = bundle.preprocessor
+        self.feature_order = tuple(bundle.feature_order)
+        self.n_features = len(self.feature_order)
+        self.version = bundle.version
+        position = {name: i for i, name in enumerate(self.feature_order)}
+
+        # Ordinal columns: value -> code, written to one output slot
+        ordinal = preprocessor.named_transformers_['ordinal']
+        self.ordinal = []
+        for column, categories in zip(_fitted_columns(preprocessor, 'ordinal'), ordinal.categories_):
+            codes = {category: float(code) for code, category in enumerate(categories)}
+            self.ordinal.append((column, position.get(column), codes))
+
+        # One-hot columns: value -> output slot that gets a 1 (dropped/unknown values set nothing)
+        onehot = preprocessor.named_transformers_['onehot']
+        onehot_cols = _fitted_columns(preprocessor, 'onehot')
+        names = iter(onehot.get_feature_names_out(onehot_cols))
+        self.onehot_strict = onehot.handle_unknown == 'error'
+        self.onehot = []
+        for j, (column, categories) in enumerate(zip(onehot_cols, onehot.categories_)):
+            dropped = onehot.drop_idx_[j] if onehot.drop_idx_ is not None else None
+            slots = {}
+            for k, category in enumerate(categories):
+                if dropped is not None and k == dropped:
+                    slots[category] = None
+                    continue
+                slots[category] = position.get(next(names))
+            self.onehot.append((column, slots))
+
+        # Multi-label columns: each category present in the list sets its indicator
+        self.multilabel = []
+        for column in MULTILABEL_COLS:
+            slots = {category: position.get(category) for category in bundle.dummy_info[column]}
+            self.multilabel.append((column, slots))
+
+        # Everything else passed through the ColumnTransformer unchanged
+        encoded = set(_fitted_columns(preprocessor, 'ordinal') + onehot_cols)
+        indicators = {c for _, slots in self.multilabel for c in slots}
+        self.numeric = [
+            (column, position.get(column))
+            for column in preprocessor.feature_names_in_
+            if column not in encoded and column not in indicators
+        ]
+        self._compile()
+
+    def _compile(self):
+        self.multilabel_encoders = []
+        for column, slots in self.multilabel:
+            kept = [category for category, slot in slots.items() if slot is not None]
+            self.multilabel_encoders.append(
+                (column, MultiLabelEncoder(kept).fit(), np.array([slots[c] for c in kept], dtype=np.intp))
+            )
+        self._template = np.zeros((1, self.n_features), dtype=np.float64)
+
+    def to_spec(self):
+        """Plain-JSON description of the encoder; ``from_spec`` rebuilds it without scikit-learn."""
+        return {
+            "feature_order": list(self.feature_order),
+            "version": self.version,
+            "ordinal": [[column, slot, codes] for column, slot, codes in self.ordinal],
+            "onehot": [[column, slots] for column, slots in self.onehot],
+            "onehot_strict": self.onehot_strict,
+            "numeric": [[column, slot] for column, slot in self.numeric],
+            "multilabel": [[column, slots] for column, slots in self.multilabel],
+        }
+
+    @classmethod
+    def from_spec(cls, spec):
+        encoder = cls.__new__(cls)
+        encoder.feature_order = tuple(spec["feature_order"])
+        encoder.n_features = len(encoder.feature_order)
+        encoder.version = spec["version"]
+        encoder.ordinal = [(column, slot, codes) for column, slot, codes in spec["ordinal"]]
+        encoder.onehot = [(column, slots) for column, slots in spec["onehot"]]
+        encoder.onehot_strict = spec["onehot_strict"]
+        encoder.numeric = [(column, slot) for column, slot in spec["numeric"]]
+        encoder.multilabel = [(column, slots) for column, slots in spec["multilabel"]]
+        encoder._compile()
+        return encoder
+
+    def encode(self, input_data):
+        row = self._template.copy()
+        out = row[0]
+
+        for column, slot, codes in self.ordinal:
+            value = input_data[column]
+            if value not in codes:
+                raise ValueError(f"Found unknown category {value!r} in column {column!r} during transform")
+            if slot is not None:
+                out[slot] = codes[value]
+
+        for column, slots in self.onehot:
+            value = input_data[column]
+            if value in slots:
+                if slots[value] is not None:
+                    out[slots[value]] = 1.0
+            elif self.onehot_strict:
+                raise ValueError(f"Found unknown category {value!r} in column {column!r} during transform")
+
+        for column, slot in self.numeric:
+            if slot is not None:
+                out[slot] = input_data[column]
+
+        for column, slots in self.multilabel:
+            for category in parse_multilabel(input_data.get(column)):
+                slot = slots.get(category)
+                if slot is not None:
+                    out[slot] = 1.0
+
+        return row
+
+    def encode_frame(self, df):
+        """Vectorized ``encode`` over every row of a DataFrame with the input_data columns."""
+        import pandas as pd
+
+        n = len(df)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        rows = np.arange(n)
+
+        for column, slot, codes in self.ordinal:
+            index = pd.Categorical(df[column], categories=list(codes)).codes
+            if (index < 0).any():
+                unknown = df[column][index < 0].unique().tolist()
+                raise ValueError(f"Found unknown categories {unknown} in column {column!r} during transform")
+            if slot is not None:
+                X[:, slot] = index
+
+        for column, slots in self.onehot:
+            index = pd.Categorical(df[column], categories=list(slots)).codes
+            if self.onehot_strict and (index < 0).any():
+                unknown = df[column][index < 0].unique().tolist()
+                raise ValueError(f"Found unknown categories {unknown} in column {column!r} during transform")
+            targets = np.array([-1 if slot is None else slot for slot in slots.values()] + [-1])
+            target = targets[index]  # index -1 (unknown) picks the trailing -1
+            hit = target >= 0
+            X[rows[hit], target[hit]] = 1.0
+
+        for column, slot in self.numeric:
+            if slot is not None:
+                X[:, slot] = pd.to_numeric(df[column]).to_numpy(dtype=np.float64)
+
+        for column, multilabel, slots in self.multilabel_encoders:
+            X[:, slots] = multilabel.transform(df[column].to_numpy(dtype=object))
+
+        return X
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_feature_encoder(bundle):
+    """Compile (once per bundle version) and return the encoder for ``bundle``."""
+    with _encoders_lock:
+        encoder = _encoders.get(bundle.version)
+        if encoder is None:
+            if bundle.encoder_spec is not None:
+                encoder = FeatureEncoder.from_spec(bundle.encoder_spec)
+            else:
+                encoder = FeatureEncoder(bundle)
+            _encoders.clear()
+            _encoders[bundle.version] = encoder
+        return encoder
+
+
+# --- Reference DataFrame pipeline (what the tracker page used to run per click) ---
+def legacy_transform(df, bundle):
+    import pandas as pd
+
+    def transform_multilabel(df, column_name, categories):
+        df = df.copy()
+        for value in categories:
+            df[value] = df[column_name].apply(lambda x: int(value in parse_multilabel(x)))
+        df.drop(columns=column_name, inplace=True)
+        return df
+
+    df = transform_multilabel(df, 'recycling', bundle.dummy_info['recycling'])
+    df = transform_multilabel(df, 'cooking_with', bundle.dummy_info['cooking_with'])
+
+    preprocessor = bundle.preprocessor
+    if preprocessor is None:
+        raise ValueError("bundle has no fitted preprocessor (loaded from a versioned artifact); use model_bundle.load_pickles()")
+    X_transformed = preprocessor.transform(df)
+    ohe_feature_names = preprocessor.named_transformers_['onehot'].get_feature_names_out(ONEHOT_COLS)
+    all_feature_names = ORDINAL_COLS + list(ohe_feature_names) + [col for col in df.columns if col not in ORDINAL_COLS + ONEHOT_COLS]
+    X_df = pd.DataFrame(X_transformed, columns=all_feature_names)
+    X_df.reset_index(drop=True, inplace=True)
+    return X_df.reindex(columns=list(bundle.feature_order), fill_value=0)
+
+
+# --- Parity check between FeatureEncoder and legacy_transform ---
+def _base_profile():
+    profile = {column: options[0] for column, options in schema.SELECT_OPTIONS.items()}
+    profile.update({column: low for column, (low, _) in schema.NUMERIC_RANGES.items()})
+    profile.update({column: [] for column in schema.MULTI_OPTIONS})
+    profile["body_type"] = schema.BODY_TYPES[0]
+    return profile
+
+
+def parity_profiles(n_random=1000, seed=0):
+    """Every option of every field (one at a time), every multi-select subset, plus random profiles."""
+    base = _base_profile()
+    profiles = [dict(base)]
+
+    categorical = dict(schema.SELECT_OPTIONS, body_type=schema.BODY_TYPES)
+    for column, options in categorical.items():
+        for option in options:
+            profiles.append(dict(base, **{column: option}))
+    for column, (low, high) in schema.NUMERIC_RANGES.items():
+        for value in (low, (low + high) // 2, high):
+            profiles.append(dict(base, **{column: value}))
+    for column, options in schema.MULTI_OPTIONS.items():
+        for size in range(len(options) + 1):
+            for subset in itertools.combinations(options, size):
+                profiles.append(dict(base, **{column: list(subset)}))
+
+    rng = random.Random(seed)
+    profiles.extend(schema.random_profile(rng) for _ in range(n_random))
+
+    # The page historically sent str(list); both forms must encode identically
+    return profiles + [dict(p, **{c: str(p[c]) for c in schema.MULTI_OPTIONS}) for p in profiles[:50]]
+
+
+def check_parity(bundle, n_random=1000):
+    """Return the number of profiles checked; raises AssertionError on the first mismatch."""
+    import pandas as pd
+
+    encoder = get_feature_encoder(bundle)
+    profiles = parity_profiles(n_random)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for profile in profiles:
+            record = {column: profile[column] for column in schema.INPUT_COLUMNS}
+            expected = legacy_transform(pd.DataFrame([record]), bundle).to_numpy(dtype=np.float64)
+            actual = encoder.encode(record)
+            if not np.array_equal(expected, actual):
+                raise AssertionError(f"Encoder mismatch for {record}:\n{expected}\n{actual}")
+
+        frame = pd.DataFrame([{column: p[column] for column in schema.INPUT_COLUMNS} for p in profiles])
+        if not np.array_equal(legacy_transform(frame, bundle).to_numpy(dtype=np.float64), encoder.encode_frame(frame)):
+            raise AssertionError("encode_frame does not match the DataFrame pipeline")
+    return len(profiles)
+
+
+if __name__ == "__main__":
+    from core.model_bundle import load_pickles
+
+    checked = check_parity(load_pickles())
+    print(f"FeatureEncoder matches the DataFrame pipeline on {checked} profiles")
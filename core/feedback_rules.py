@@ -0,0 +1,165 @@
+"""Declarative dashboard feedback rules, evaluated per profile or over a whole DataFrame.
+
+Each rule looks at one input field and picks the first matching case; the last
+case of every rule is its fallback. The dashboard, the PDF/HTML/text reports
+and the bulk exporter all read their feedback from this table, so a threshold
+lives in exactly one place.
+"""
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+from core.multilabel import _cell_key, parse_multilabel
+
+
+class Feedback(NamedTuple):
+    level: str  # success / info / warning / error, as in st.<level>
+    message: str
+    icon: str = ""
+
+
+@dataclass(frozen=True)
+class Case:
+    op: str  # "in", "gt", "nonempty" or "else"
+    operand: object
+    feedback: Feedback
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    field: str
+    cases: tuple
+
+
+def _rule(name, field, *cases):
+    return Rule(name, field, tuple(Case(op, operand, Feedback(*feedback)) for op, operand, feedback in cases))
+
+
+FEEDBACK_RULES = (
+    _rule("diet", "diet",
+          ("in", ("vegan", "vegetarian"), ("success", "Great diet choice! You're helping the environment by eating plant-based.")),
+          ("in", ("pescatarian",), ("info", "Good diet choice! But consider eating more plant-based meals.")),
+          ("else", None, ("warning", "Eating more plant-based meals can lower your carbon footprint."))),
+    _rule("social_activity", "social_activity",
+          ("in", ("never",), ("success", "Low social activity can indirectly reduce travel emissions. Nice!")),
+          ("else", None, ("info", "Active social life? Try carpooling or using public transport for outings."))),
+    _rule("shower_frequency", "shower_frequency",
+          ("in", ("once a day", "less frequently"), ("success", "Good shower habits! Saving water and energy.")),
+          ("else", None, ("warning", "Try reducing shower frequency or duration to save water."))),
+    _rule("vehicle_distance", "vehicle_monthly_distance_km",
+          ("gt", 1000, ("warning", "High vehicle usage detected. Consider carpooling or biking more often.", "🚗")),
+          ("else", None, ("success", "Great! Your vehicle usage is within a reasonable range.", "🚗"))),
+    _rule("air_travel", "air_travel_frequency",
+          ("in", ("frequently", "very frequently"), ("error", "Frequent air travel significantly increases your footprint. Reduce if possible.", "✈️")),
+          ("else", None, ("success", "Low air travel! Good for minimizing emissions.", "✈️"))),
+    _rule("waste_bags", "waste_bag_weekly_count",
+          ("gt", 5, ("warning", "You produce a lot of waste weekly. Try composting and reducing waste.", "🗑")),
+          ("else", None, ("success", "Excellent! You are producing a small amount of waste.", "🗑"))),
+    _rule("recycling", "recycling",
+          ("nonempty", None, ("success", "Good job recycling materials!", "♻️")),
+          ("else", None, ("warning", "Start recycling to contribute to waste reduction.", "♻️"))),
+    _rule("heating", "heating_energy_source",
+          ("in", ("electricity", "natural gas"), ("success", "Great eco-friendly heating source!", "🔋")),
+          ("else", None, ("warning", "Consider switching to renewable heating if possible.", "⚡"))),
+    _rule("energy_efficiency", "energy_efficiency",
+          ("in", ("yes",), ("success", "Awesome! Energy-efficient devices reduce carbon footprint.", "💡")),
+          ("else", None, ("warning", "Try investing in energy-efficient appliances.", "💡"))),
+    _rule("screen_time", "tv_pc_daily_hours",
+          ("gt", 5, ("warning", "Too much screen time! Reduce PC/TV usage to save electricity.", "🖥")),
+          ("else", None, ("success", "Good! Your screen time is moderate.", "🖥"))),
+    _rule("internet", "internet_daily_hours",
+          ("gt", 8, ("warning", "High internet usage. Consider reducing time online to save energy.", "🖥")),
+          ("else", None, ("success", "Good! Your internet usage is moderate.", "🖥"))),
+    _rule("grocery_bill", "monthly_grocery_bill",
+          ("gt", 54, ("warning", "High grocery bill! Consider buying local and seasonal products.")),
+          ("else", None, ("success", "Good job managing your grocery expenses."))),
+    _rule("clothes", "new_clothes_monthly",
+          ("gt", 5, ("warning", "Buying many clothes monthly can increase your carbon footprint. Buy mindfully.")),
+          ("else", None, ("success", "Minimal clothing purchases. Good for sustainability!"))),
+)
+
+RULES_BY_NAME = {rule.name: rule for rule in FEEDBACK_RULES}
+
+
+# --- Single profile ---
+def _matches(case, value):
+    if case.op == "in":
+        return isinstance(value, str) and value.lower() in case.operand
+    if case.op == "gt":
+        return value is not None and value > case.operand
+    if case.op == "nonempty":
+        try:
+            return len(parse_multilabel(value)) > 0
+        except (ValueError, SyntaxError):
+            return False
+    return True
+
+
+def evaluate(input_data, rules=FEEDBACK_RULES):
+    """``{rule name: Feedback}`` for one input_data dict."""
+    outcomes = {}
+    for rule in rules:
+        value = input_data.get(rule.field)
+        outcomes[rule.name] = next(case.feedback for case in rule.cases if _matches(case, value))
+    return outcomes
+
+
+# --- Vectorized over a DataFrame ---
+def _nonempty_mask(values):
+    # Parse each distinct cell once; survey exports repeat the same few lists
+    counts = {}
+    mask = np.empty(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        key = _cell_key(value)
+        if key not in counts:
+            try:
+                counts[key] = len(parse_multilabel(value)) > 0
+            except (ValueError, SyntaxError):
+                counts[key] = False
+        mask[i] = counts[key]
+    return mask
+
+
+def _case_mask(case, column, n):
+    if case.op == "else":
+        return np.ones(n, dtype=bool)
+    if column is None:
+        return np.zeros(n, dtype=bool)
+    if case.op == "in":
+        return column.astype(str).str.lower().isin(case.operand).to_numpy()
+    if case.op == "gt":
+        return np.nan_to_num(column.to_numpy(dtype=np.float64, na_value=np.nan), nan=-np.inf) > case.operand
+    if case.op == "nonempty":
+        return _nonempty_mask(column.to_numpy(dtype=object))
+    raise ValueError(f"Unknown rule operator {case.op!r}")
+
+
+def evaluate_codes(df, rules=FEEDBACK_RULES):
+    """Index of the matching case for every rule and row, as ``{rule name: int8 array}``."""
+    n = len(df)
+    codes = {}
+    for rule in rules:
+        column = df[rule.field] if rule.field in df.columns else None
+        masks = [_case_mask(case, column, n) for case in rule.cases]
+        codes[rule.name] = np.select(masks, np.arange(len(masks), dtype=np.int8), default=len(masks) - 1).astype(np.int8)
+    return codes
+
+
+def outcomes_from_codes(codes, row, rules=FEEDBACK_RULES):
+    """The ``evaluate`` result for one row of an ``evaluate_codes`` result."""
+    return {rule.name: rule.cases[int(codes[rule.name][row])].feedback for rule in rules}
+
+
+def evaluate_frame(df, rules=FEEDBACK_RULES):
+    """One ``<rule>_level`` and ``<rule>_message`` column per rule, aligned with ``df``."""
+    import pandas as pd
+
+    codes = evaluate_codes(df, rules)
+    columns = {}
+    for rule in rules:
+        code = codes[rule.name]
+        columns[f"{rule.name}_level"] = np.array([case.feedback.level for case in rule.cases], dtype=object)[code]
+        columns[f"{rule.name}_message"] = np.array([case.feedback.message for case in rule.cases], dtype=object)[code]
+    return pd.DataFrame(columns, index=df.index)
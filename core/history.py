@@ -0,0 +1,203 @@
+"""Prediction history, kept in a local SQLite database.
+
+Usage:
+    python -m core.history --fill 1000000 --profiles 50000    # load synthetic history and time trend queries
+
+Every tracked prediction is stored with its inputs and the model version that
+made it, under a profile id carried in the page URL (``?profile=...``). The
+database runs in WAL mode so the dashboard can read while another session
+writes, and rows are indexed on ``(profile_id, ts)`` so a trend query only
+touches the one profile's most recent rows however large the table grows.
+Set CARBON_HISTORY_DB to move the database (default: data/history.sqlite3).
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_ENV = "CARBON_HISTORY_DB"
+DEFAULT_DB = os.path.join(ROOT, "data", "history.sqlite3")
+PROFILE_PARAM = "profile"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    profile_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    prediction REAL NOT NULL,
+    model_version TEXT NOT NULL,
+    inputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_profile_ts ON predictions (profile_id, ts);
+CREATE TABLE IF NOT EXISTS derived_state (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+class HistoryPoint(NamedTuple):
+    ts: float  # Unix time
+    prediction: float
+    model_version: str
+
+
+class HistoryStore:
+    """Append-mostly store of predictions; one SQLite connection per thread."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(DB_ENV) or DEFAULT_DB
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+            with self._init_lock:
+                if not self._initialized:
+                    connection.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.connection = connection
+        return connection
+
+    def record(self, profile_id, input_data, prediction, model_version, ts=None):
+        self.record_many([(profile_id, input_data, prediction, model_version, ts)])
+
+    def record_many(self, rows):
+        """Insert ``(profile_id, input_data, prediction, model_version, ts)`` tuples in one transaction."""
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO predictions (profile_id, ts, prediction, model_version, inputs) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (profile_id, now if ts is None else ts, float(prediction), model_version,
+                     input_data if isinstance(input_data, str) else json.dumps(input_data))
+                    for profile_id, input_data, prediction, model_version, ts in rows
+                ),
+            )
+
+    def trend(self, profile_id, since=None, limit=200):
+        """The profile's most recent ``limit`` predictions (after ``since``, if given), oldest first."""
+        query = "SELECT ts, prediction, model_version FROM predictions WHERE profile_id = ?"
+        params = [profile_id]
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        rows = self._connection().execute(query, params).fetchall()
+        return [HistoryPoint(*row) for row in reversed(rows)]
+
+    def latest_inputs(self, profile_id):
+        """The input_data of the profile's most recent prediction, or None."""
+        row = self._connection().execute(
+            "SELECT inputs FROM predictions WHERE profile_id = ? ORDER BY ts DESC LIMIT 1", (profile_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def last_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM predictions").fetchone()[0]
+
+    def latest_per_profile(self, changed_after, changed_until, as_of, fields=()):
+        """``(prediction, *input fields)`` of each profile's latest row with id up to ``as_of``.
+
+        Only profiles with a row in ids ``(changed_after, changed_until]`` are returned.
+        """
+        extracts = "".join(f", json_extract(inputs, '$.{field}')" for field in fields)
+        # SQLite takes the bare columns from the row holding MAX(ts)
+        rows = self._connection().execute(
+            f"SELECT MAX(ts), prediction{extracts} FROM predictions WHERE id <= ? AND profile_id IN "
+            "(SELECT profile_id FROM predictions WHERE id > ? AND id <= ?) GROUP BY profile_id",
+            (as_of, changed_after, changed_until),
+        ).fetchall()
+        return [row[1:] for row in rows]
+
+    def load_state(self, name):
+        """``(last_id, data)`` saved by ``save_state`` for a summary kept up to date from this store, or None."""
+        return self._connection().execute(
+            "SELECT last_id, data FROM derived_state WHERE name = ?", (name,)
+        ).fetchone()
+
+    def save_state(self, name, last_id, data):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO derived_state (name, last_id, data) VALUES (?, ?, ?)", (name, last_id, data)
+            )
+
+    def count(self, profile_id=None):
+        if profile_id is None:
+            return self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM predictions WHERE profile_id = ?", (profile_id,)
+        ).fetchone()[0]
+
+
+history_store = HistoryStore()
+
+
+def current_profile_id():
+    """This browser's profile id: taken from ``?profile=`` in the URL, or created and added to it.
+
+    Kept in session state as well, since switching pages drops the query string.
+    """
+    import streamlit as st
+
+    profile_id = st.query_params.get(PROFILE_PARAM) or st.session_state.get("profile_id") or uuid.uuid4().hex
+    st.session_state.profile_id = profile_id
+    if st.query_params.get(PROFILE_PARAM) != profile_id:
+        st.query_params[PROFILE_PARAM] = profile_id
+    return profile_id
+
+
+def main(argv=None):
+    from core import schema
+
+    parser = argparse.ArgumentParser(description="Fill a history database with synthetic predictions and time trend queries.")
+    parser.add_argument("--db", default=None, help="Database path (default: CARBON_HISTORY_DB or data/history.sqlite3)")
+    parser.add_argument("--fill", type=int, default=0, help="Synthetic predictions to add first")
+    parser.add_argument("--profiles", type=int, default=10_000, help="Distinct profile ids in the synthetic data")
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    rng = random.Random(0)
+    if args.fill:
+        start = time.perf_counter()
+        inputs = json.dumps(schema.random_profile(rng))
+        now = time.time()
+        batch = 50_000
+        for offset in range(0, args.fill, batch):
+            store.record_many(
+                (f"p{rng.randrange(args.profiles)}", inputs, rng.uniform(500, 4000), "synthetic",
+                 now - rng.uniform(0, 365 * 86400))
+                for _ in range(min(batch, args.fill - offset))
+            )
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {args.fill:,} predictions in {elapsed:.1f}s ({args.fill / elapsed:,.0f} rows/sec)")
+
+    total = store.count()
+    start = time.perf_counter()
+    points = 0
+    for _ in range(args.queries):
+        points += len(store.trend(f"p{rng.randrange(args.profiles)}", since=time.time() - 90 * 86400))
+    per_query = (time.perf_counter() - start) / args.queries
+    print(f"{total:,} stored predictions; 90-day trend query {per_query * 1000:.3f} ms "
+          f"({points / args.queries:.1f} points on average)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Score a linear model with NumPy alone, without unpickling it.
+
+Usage:
+    python -m core.lean_scoring       # compile models/lean_model.json from the current bundle and check it
+
+Unpickling the model bundle imports scikit-learn, SciPy and pandas, which is
+most of a worker's cold start. When the model is linear, its coefficients and
+the compiled FeatureEncoder are all a prediction needs, so they are exported to
+a small JSON file. The file records the bundle version it was compiled from and
+is ignored as soon as the pickles on disk change, or when CARBON_MODEL_MODE
+selects the fast path or the lookup table.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from core.artifact import is_linear
+from core.fast_path import MODE_ENV
+from core.features import FeatureEncoder, get_feature_encoder
+from core.model_bundle import MODEL_DIR, current_version, get_model_bundle
+from core.model_bundle import warm_up as warm_up_bundle
+
+LEAN_MODEL_FILE = "lean_model.json"
+
+_scorers = {}
+_lock = threading.Lock()
+
+
+class LeanScorer:
+    """Encoder and ``X @ coef + intercept`` for one bundle version."""
+
+    def __init__(self, spec):
+        self.version = spec["version"]
+        self.encoder = FeatureEncoder.from_spec(spec["encoder"])
+        self.coef = np.asarray(spec["coef"], dtype=np.float64)
+        self.intercept = float(spec["intercept"])
+
+    def predict(self, X):
+        return X @ self.coef + self.intercept
+
+
+def compile_lean_model(bundle=None, out_path=None):
+    """Write the bundle's encoder and coefficients to JSON; returns the spec (None if the model is not linear)."""
+    bundle = bundle or get_model_bundle()
+    if not is_linear(bundle.model):
+        return None
+    spec = {
+        "version": bundle.version,
+        "model": type(bundle.model).__name__,
+        "encoder": get_feature_encoder(bundle).to_spec(),
+        "coef": np.asarray(bundle.model.coef_, dtype=np.float64).tolist(),
+        "intercept": float(bundle.model.intercept_),
+    }
+    out_path = out_path or os.path.join(MODEL_DIR, LEAN_MODEL_FILE)
+    with open(f"{out_path}.tmp", "w") as f:
+        json.dump(spec, f, indent=1)
+    os.replace(f"{out_path}.tmp", out_path)
+    return spec
+
+
+def _load_scorer(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _lock:
+        scorer = _scorers.get(key)
+        if scorer is None:
+            with open(path) as f:
+                scorer = LeanScorer(json.load(f))
+            _scorers.clear()
+            _scorers[key] = scorer
+        return scorer
+
+
+def get_lean_scorer(model_dir=MODEL_DIR):
+    """The LeanScorer for the artifacts on disk, or None when it is missing, stale or not wanted."""
+    if os.environ.get(MODE_ENV, "full").lower() != "full":
+        return None
+    path = os.path.join(model_dir, LEAN_MODEL_FILE)
+    if not os.path.exists(path):
+        return None
+    scorer = _load_scorer(path)
+    return scorer if scorer.version == current_version(model_dir) else None
+
+
+def warm_up(model_dir=MODEL_DIR, background=False):
+    """Load the lean scorer if it can serve, otherwise the full bundle (see ``model_bundle.warm_up``)."""
+    scorer = get_lean_scorer(model_dir)
+    if scorer is not None:
+        return scorer
+    return warm_up_bundle(model_dir, background)
+
+
+def main(argv=None):
+    from core import schema
+
+    parser = argparse.ArgumentParser(description="Compile the linear model to JSON for scikit-learn-free scoring.")
+    parser.add_argument("--output", default=None, help=f"Where to write it (default: models/{LEAN_MODEL_FILE})")
+    parser.add_argument("--check", type=int, default=10_000, help="Random profiles to compare against the bundle")
+    args = parser.parse_args(argv)
+
+    bundle = get_model_bundle()
+    spec = compile_lean_model(bundle, args.output)
+    if spec is None:
+        print(f"{type(bundle.model).__name__} is not a linear model; nothing to compile")
+        return
+    scorer = LeanScorer(spec)
+
+    import pandas as pd
+
+    rng = random.Random(0)
+    frame = pd.DataFrame([schema.random_profile(rng) for _ in range(args.check)])
+    expected = bundle.model.predict(get_feature_encoder(bundle).encode_frame(frame))
+    start = time.perf_counter()
+    actual = scorer.predict(scorer.encoder.encode_frame(frame))
+    elapsed = time.perf_counter() - start
+    print(f"Compiled {spec['model']} ({len(spec['coef'])} coefficients) for bundle {spec['version']}")
+    print(f"Max difference from the bundle on {args.check:,} profiles: {np.abs(actual - expected).max():.2e} "
+          f"({elapsed * 1000:.1f} ms to score them)")
+
+
+if __name__ == "__main__":
+    main()
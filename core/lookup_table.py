@@ -0,0 +1,421 @@
+"""Precomputed prediction table for the tracker's discrete input space.
+
+Build (scores the loaded ensemble offline and reports size and error):
+    python -m core.lookup_table
+    python -m core.lookup_table --max-knots 17 --pair-knots 5 --samples 20000
+
+Serve from it by setting CARBON_MODEL_MODE=table. Every combination of the
+single-choice fields (including body type) is one row of a float32 table that
+is memory-mapped, not loaded. A row holds the ensemble's prediction for that
+combination at reference numeric values with nothing recycled or cooked, plus:
+
+* per numeric field, the change in prediction at each knot (every integer of
+  the slider when it has at most ``max_knots`` values, otherwise ``max_knots``
+  evenly spaced points, linearly interpolated in between);
+* per recycling / cooking_with option, the change from ticking that option;
+* interaction terms: for every pair of numeric fields, every numeric field and
+  option, and every pair of options, what the pair adds beyond its two single
+  changes. Numeric fields enter these on a coarser grid of ``pair_knots`` of
+  their knots (bilinear in between); ``--pair-knots 0`` leaves them out.
+
+Tree ensembles are not additive, so the table approximates them. The build
+measures its error against the live model, and like the fast path, the table is
+served only when it was built from the currently loaded ensemble and its mean
+deviation relative to it is within CARBON_TABLE_MAX_DEVIATION (default 0.02).
+CARBON_TABLE_MAX_ERROR additionally caps the largest error in units.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import warnings
+from bisect import bisect_right
+
+import numpy as np
+
+from core import schema
+from core.fast_path import DEFAULT_MAX_DEVIATION
+from core.features import get_feature_encoder, parity_profiles
+from core.model_bundle import MODEL_DIR, get_model_bundle
+from core.multilabel import parse_multilabel
+
+TABLE_FILE = "lookup_table.npy"
+META_FILE = "lookup_table.json"
+MODE_ENV = "CARBON_MODEL_MODE"
+MAX_DEVIATION_ENV = "CARBON_TABLE_MAX_DEVIATION"
+MAX_ERROR_ENV = "CARBON_TABLE_MAX_ERROR"
+DEFAULT_MAX_KNOTS = 9
+DEFAULT_PAIR_KNOTS = 3
+
+CATEGORICAL = dict(schema.SELECT_OPTIONS, body_type=schema.BODY_TYPES)
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def _knots(low, high, max_knots):
+    if high - low + 1 <= max_knots:
+        return list(range(low, high + 1))
+    return sorted({int(round(k)) for k in np.linspace(low, high, max_knots)})
+
+
+def _pair_knots(knots, n):
+    """Indices of ``n`` evenly spaced knots (always including the reference, the middle knot) for interaction terms."""
+    if n < 2 or len(knots) < 2:
+        return []
+    return sorted({int(round(i)) for i in np.linspace(0, len(knots) - 1, n)} | {len(knots) // 2})
+
+
+def _interpolate(knots, x):
+    """``[(index, weight), ...]`` of the knots around ``x`` (which must lie within them)."""
+    if len(knots) == 1:
+        return [(0, 1.0)]
+    i = min(bisect_right(knots, x) - 1, len(knots) - 2)
+    if x == knots[i]:
+        return [(i, 1.0)]
+    t = (x - knots[i]) / (knots[i + 1] - knots[i])
+    return [(i, 1 - t), (i + 1, t)]
+
+
+class LookupTable:
+    """Per-cell prediction table (main effects plus pairwise interactions) over a memory-mapped float32 array."""
+
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.version = meta["model_version"]
+        self._fields = [(column, {option: i for i, option in enumerate(options)}, stride)
+                        for column, options, stride in meta["fields"]]
+        self._axes = [(column, knots, offset) for column, knots, offset in meta["axes"]]
+        self._flags = [(column, offsets) for column, offsets in meta["flags"]]
+        # Interaction grids hold only the knots off the reference; weight on the reference contributes nothing
+        self._pair_axes = {}
+        for column, knots, _ in self._axes:
+            indices = meta.get("pair_axes", {}).get(column, [])
+            if indices:
+                reference = len(knots) // 2
+                nonref = {j: n for n, j in enumerate(i for i in indices if i != reference)}
+                self._pair_axes[column] = ([knots[i] for i in indices], [nonref.get(i) for i in indices], len(nonref))
+        self._numeric_pairs = meta.get("numeric_pairs", [])
+        self._numeric_flags = meta.get("numeric_flag_pairs", [])
+        self._flag_pairs = meta.get("flag_pairs", [])
+
+    def cell(self, input_data):
+        """Row index for ``input_data``'s single-choice answers, or None if one is not in the table."""
+        cell = 0
+        for column, index, stride in self._fields:
+            i = index.get(input_data.get(column))
+            if i is None:
+                return None
+            cell += i * stride
+        return cell
+
+    def predict(self, input_data):
+        """Table prediction for one input_data dict, or None when it falls outside the table."""
+        cell = self.cell(input_data)
+        if cell is None:
+            return None
+        row = self.table[cell].tolist()
+        total = row[0]
+        for column, knots, offset in self._axes:
+            x = input_data.get(column)
+            if x is None or not knots[0] <= x <= knots[-1]:
+                return None
+            for i, w in _interpolate(knots, x):
+                total += row[offset + i] * w
+
+        active = {}
+        for column, offsets in self._flags:
+            try:
+                labels = set(parse_multilabel(input_data.get(column)))
+            except (ValueError, SyntaxError):
+                return None
+            active[column] = labels
+            for label in labels:
+                offset = offsets.get(label)
+                if offset is not None:
+                    total += row[offset]
+
+        # (position among off-reference knots, weight) around each numeric value
+        weights = {}
+        for column, (knots, nonref, _) in self._pair_axes.items():
+            weights[column] = [(nonref[i], w) for i, w in _interpolate(knots, input_data[column]) if nonref[i] is not None]
+        for column_1, column_2, offset in self._numeric_pairs:
+            width = self._pair_axes[column_2][2]
+            for i, w1 in weights[column_1]:
+                for j, w2 in weights[column_2]:
+                    total += row[offset + i * width + j] * w1 * w2
+        for column, flag_column, option, offset in self._numeric_flags:
+            if option in active[flag_column]:
+                for i, w in weights[column]:
+                    total += row[offset + i] * w
+        for column_1, option_1, column_2, option_2, offset in self._flag_pairs:
+            if option_1 in active[column_1] and option_2 in active[column_2]:
+                total += row[offset]
+        return total
+
+
+# --- Building ---
+def build_table(bundle=None, max_knots=DEFAULT_MAX_KNOTS, pair_knots=DEFAULT_PAIR_KNOTS, samples=20_000,
+                out_dir=MODEL_DIR, log=print):
+    """Score the ensemble over the table's grid, save it under ``out_dir`` and return its metadata."""
+    import pandas as pd
+
+    bundle = bundle or get_model_bundle()
+    encoder = get_feature_encoder(bundle)
+    model = bundle.model
+    start = time.perf_counter()
+
+    # Cells in row-major order of CATEGORICAL, last field varying fastest
+    columns = list(CATEGORICAL)
+    sizes = [len(CATEGORICAL[c]) for c in columns]
+    strides = [int(np.prod(sizes[i + 1:])) for i in range(len(sizes))]
+    grid = np.indices(sizes).reshape(len(sizes), -1)
+    n_cells = grid.shape[1]
+
+    numeric_slots = dict(encoder.numeric)
+    reference = {}
+    axes = []
+    width = 1
+    for column, (low, high) in schema.NUMERIC_RANGES.items():
+        knots = _knots(low, high, max_knots)
+        reference[column] = knots[len(knots) // 2]
+        axes.append((column, knots, width))
+        width += len(knots)
+    flags = []
+    for column, slots in encoder.multilabel:
+        offsets = {}
+        for category in schema.MULTI_OPTIONS[column]:
+            if slots.get(category) is not None:
+                offsets[category] = width
+                width += 1
+        flags.append((column, offsets))
+
+    # Interaction terms, each over the off-reference pair knots (numeric) or a single ticked option
+    pair_axes = {}
+    for column, knots, _ in axes:
+        indices = _pair_knots(knots, pair_knots) if numeric_slots[column] is not None else []
+        if indices:
+            pair_axes[column] = indices
+    pair_values = {c: [(knots[i], i) for i in pair_axes[c] if i != len(knots) // 2] for c, knots, _ in axes if c in pair_axes}
+    numeric_pairs = []
+    for i, column_1 in enumerate(pair_values):
+        for column_2 in list(pair_values)[i + 1:]:
+            numeric_pairs.append((column_1, column_2, width))
+            width += len(pair_values[column_1]) * len(pair_values[column_2])
+    options = [(column, category) for column, offsets in flags for category in offsets]
+    numeric_flag_pairs = []
+    flag_pairs = []
+    if pair_knots:
+        for column in pair_values:
+            for flag_column, category in options:
+                numeric_flag_pairs.append((column, flag_column, category, width))
+                width += len(pair_values[column])
+        for i, (column_1, category_1) in enumerate(options):
+            for column_2, category_2 in options[i + 1:]:
+                flag_pairs.append((column_1, category_1, column_2, category_2, width))
+                width += 1
+
+    cells = pd.DataFrame({c: np.asarray(CATEGORICAL[c], dtype=object)[grid[i]] for i, c in enumerate(columns)})
+    for column, value in reference.items():
+        cells[column] = value
+    for column in schema.MULTI_OPTIONS:
+        cells[column] = [[] for _ in range(n_cells)]
+    X = encoder.encode_frame(cells)
+    log(f"Scoring {n_cells:,} cells x {width} columns ({n_cells * width:,} predictions)")
+
+    table = np.empty((n_cells, width), dtype=np.float32)
+    base = model.predict(X)
+    table[:, 0] = base
+    for column, knots, offset in axes:
+        slot = numeric_slots[column]
+        for k, knot in enumerate(knots):
+            if slot is None:
+                table[:, offset + k] = 0.0
+                continue
+            X[:, slot] = knot
+            table[:, offset + k] = model.predict(X) - base
+        if slot is not None:
+            X[:, slot] = reference[column]
+    flag_slots = {}
+    for (column, offsets), (_, slots) in zip(flags, encoder.multilabel):
+        for category, offset in offsets.items():
+            X[:, slots[category]] = 1.0
+            table[:, offset] = model.predict(X) - base
+            X[:, slots[category]] = 0.0
+            flag_slots[column, category] = slots[category]
+
+    def interaction(settings, single_1, single_2):
+        """What setting both inputs adds beyond their two single changes (from columns already filled)."""
+        saved = [(slot, X[:, slot].copy()) for slot, _ in settings]
+        for slot, value in settings:
+            X[:, slot] = value
+        joint = model.predict(X) - base
+        for slot, values in saved:
+            X[:, slot] = values
+        return joint - table[:, single_1] - table[:, single_2]
+
+    axis_offsets = {column: offset for column, _, offset in axes}
+    for column_1, column_2, offset in numeric_pairs:
+        log(f"  {column_1} x {column_2}")
+        n_2 = len(pair_values[column_2])
+        for i, (value_1, k_1) in enumerate(pair_values[column_1]):
+            for j, (value_2, k_2) in enumerate(pair_values[column_2]):
+                table[:, offset + i * n_2 + j] = interaction(
+                    [(numeric_slots[column_1], value_1), (numeric_slots[column_2], value_2)],
+                    axis_offsets[column_1] + k_1, axis_offsets[column_2] + k_2,
+                )
+    flag_offsets = {(column, category): offset for column, offsets in flags for category, offset in offsets.items()}
+    for column, flag_column, category, offset in numeric_flag_pairs:
+        for i, (value, k) in enumerate(pair_values[column]):
+            table[:, offset + i] = interaction(
+                [(numeric_slots[column], value), (flag_slots[flag_column, category], 1.0)],
+                axis_offsets[column] + k, flag_offsets[flag_column, category],
+            )
+    for column_1, category_1, column_2, category_2, offset in flag_pairs:
+        table[:, offset] = interaction(
+            [(flag_slots[column_1, category_1], 1.0), (flag_slots[column_2, category_2], 1.0)],
+            flag_offsets[column_1, category_1], flag_offsets[column_2, category_2],
+        )
+    build_seconds = time.perf_counter() - start
+
+    os.makedirs(out_dir, exist_ok=True)
+    table_path = os.path.join(out_dir, TABLE_FILE)
+    np.save(f"{table_path}.tmp.npy", table)
+    os.replace(f"{table_path}.tmp.npy", table_path)
+
+    meta = {
+        "model_version": bundle.version,
+        "fields": [[c, list(CATEGORICAL[c]), s] for c, s in zip(columns, strides)],
+        "axes": [[c, knots, offset] for c, knots, offset in axes],
+        "flags": [[c, offsets] for c, offsets in flags],
+        "pair_axes": pair_axes,
+        "numeric_pairs": [list(p) for p in numeric_pairs],
+        "numeric_flag_pairs": [list(p) for p in numeric_flag_pairs],
+        "flag_pairs": [list(p) for p in flag_pairs],
+        "max_knots": max_knots,
+        "pair_knots": pair_knots,
+        "cells": n_cells,
+        "columns": width,
+        "bytes": int(table.nbytes),
+        "build_seconds": build_seconds,
+    }
+    lookup = LookupTable(np.load(table_path, mmap_mode="r"), meta)
+    meta["metrics"] = error_report(lookup, bundle, samples)
+    meta_path = os.path.join(out_dir, META_FILE)
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    return meta
+
+
+def error_report(lookup, bundle, samples=20_000):
+    """Table vs live ensemble on every single-field option, every multi-select subset and random profiles."""
+    import pandas as pd
+
+    profiles = parity_profiles(n_random=samples)
+    frame = pd.DataFrame([{c: p[c] for c in schema.INPUT_COLUMNS} for p in profiles])
+    live = bundle.model.predict(get_feature_encoder(bundle).encode_frame(frame))
+
+    start = time.perf_counter()
+    table = np.array([lookup.predict(p) for p in profiles], dtype=np.float64)
+    lookup_us = (time.perf_counter() - start) / len(profiles) * 1e6
+
+    error = np.abs(table - live)
+    return {
+        "profiles": len(profiles),
+        "max_abs_error": float(error.max()),
+        "mean_abs_error": float(error.mean()),
+        "max_relative_error": float((error / np.abs(live)).max()),
+        # Same measure the fast path is gated on
+        "mean_relative_error": float(error.mean() / np.abs(live).mean()),
+        "lookup_us": lookup_us,
+    }
+
+
+# --- Serving ---
+def _load_table(model_dir):
+    table_path = os.path.join(model_dir, TABLE_FILE)
+    meta_path = os.path.join(model_dir, META_FILE)
+    st = os.stat(table_path)
+    key = (model_dir, st.st_mtime_ns, st.st_size)
+    with _lock:
+        lookup = _tables.get(key)
+        if lookup is None:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            lookup = LookupTable(np.load(table_path, mmap_mode="r"), meta)
+            _tables.clear()
+            _tables[key] = lookup
+        return lookup
+
+
+def table_enabled():
+    return os.environ.get(MODE_ENV, "full").lower() == "table"
+
+
+def select_table(bundle, model_dir=MODEL_DIR):
+    """The lookup table to serve ``bundle`` from, or None to use the model."""
+    if not table_enabled():
+        return None
+    if not os.path.exists(os.path.join(model_dir, TABLE_FILE)):
+        warnings.warn(f"{MODE_ENV}=table but {TABLE_FILE} has not been built; using the full ensemble")
+        return None
+
+    lookup = _load_table(model_dir)
+    if lookup.version != bundle.version:
+        warnings.warn("lookup table was built from a different ensemble; using the full ensemble")
+        return None
+    metrics = lookup.meta["metrics"]
+    limit = float(os.environ.get(MAX_DEVIATION_ENV, DEFAULT_MAX_DEVIATION))
+    deviation = metrics.get("mean_relative_error", float("inf"))  # tables built before it was measured
+    if deviation > limit:
+        warnings.warn(
+            f"lookup table deviates from the ensemble by {deviation:.2%} on average "
+            f"(limit {limit:.2%}); using the full ensemble"
+        )
+        return None
+    cap = os.environ.get(MAX_ERROR_ENV)
+    if cap is not None and metrics["max_abs_error"] > float(cap):
+        warnings.warn(
+            f"lookup table is off by up to {metrics['max_abs_error']:.2f} units "
+            f"(limit {float(cap):.2f}); using the full ensemble"
+        )
+        return None
+    return lookup
+
+
+def table_predictions(bundle, profiles, model_dir=MODEL_DIR):
+    """The served table's prediction for each input_data dict; None where the model has to score it.
+
+    Every entry is None when :func:`select_table` does not serve the table.
+    """
+    lookup = select_table(bundle, model_dir)
+    if lookup is None:
+        return [None] * len(profiles)
+    return [lookup.predict(input_data) for input_data in profiles]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the prediction lookup table for the tracker's input space.")
+    parser.add_argument("--max-knots", type=int, default=DEFAULT_MAX_KNOTS,
+                        help=f"Knots per numeric field; shorter sliders get every value (default: {DEFAULT_MAX_KNOTS})")
+    parser.add_argument("--pair-knots", type=int, default=DEFAULT_PAIR_KNOTS,
+                        help=f"Knots per numeric field in interaction terms; 0 for none (default: {DEFAULT_PAIR_KNOTS})")
+    parser.add_argument("--samples", type=int, default=20_000, help="Random profiles in the error report (default: 20000)")
+    parser.add_argument("--output", default=MODEL_DIR, help="Directory for the table files (default: models/)")
+    args = parser.parse_args(argv)
+
+    meta = build_table(max_knots=args.max_knots, pair_knots=args.pair_knots, samples=args.samples, out_dir=args.output)
+    metrics = meta["metrics"]
+    print(f"Built {meta['cells']:,} cells x {meta['columns']} columns in {meta['build_seconds']:.1f}s "
+          f"({meta['bytes'] / 1e6:.1f} MB, memory-mapped) -> {os.path.join(args.output, TABLE_FILE)}")
+    print(f"Error vs the live ensemble on {metrics['profiles']:,} profiles: max {metrics['max_abs_error']:.4f} units "
+          f"({metrics['max_relative_error']:.4%}), mean {metrics['mean_abs_error']:.4f} "
+          f"({metrics['mean_relative_error']:.4%})")
+    print(f"Lookup: {metrics['lookup_us']:.1f} µs per profile")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import warnings
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Tuple
+
+# --- Artifact locations ---
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+ARTIFACT_FILES = {
+    "model": "ensemble_model.pkl",
+    "dummy_info": "dummy_info.pkl",
+    "preprocessor": "preprocessor.pkl",
+    "feature_order": "feature_order.pkl",
+}
+
+# Versioned format written by core.artifact; served instead of the pickles it was exported from
+ARTIFACT_DIR = "artifact"
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Everything needed to score a profile, loaded together so the pieces cannot drift."""
+    model: Any
+    preprocessor: Any
+    dummy_info: Mapping[str, Tuple[str, ...]]
+    feature_order: Tuple[str, ...]
+    version: str
+    encoder_spec: Any = None  # FeatureEncoder.to_spec(); artifacts carry this instead of the preprocessor
+
+
+# One bundle per model directory for the whole process: {model_dir: (stat_signature, bundle)}
+_bundles = {}
+_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def _artifact_paths(model_dir):
+    return {key: os.path.join(model_dir, name) for key, name in ARTIFACT_FILES.items()}
+
+
+def _manifest_path(model_dir):
+    return os.path.join(model_dir, ARTIFACT_DIR, MANIFEST_FILE)
+
+
+def _stat_signature(model_dir):
+    # Cheap per-call check; only when this changes do we pay for hashing the files.
+    signature = []
+    for path in [*_artifact_paths(model_dir).values(), _manifest_path(model_dir)]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            signature.append((path, None, None))
+            continue
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def _checksum(model_dir):
+    digest = hashlib.sha256()
+    for key, path in sorted(_artifact_paths(model_dir).items()):
+        digest.update(key.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _freeze_dummy_info(dummy_info, feature_order):
+    # dummy_info holds sets, whose iteration order changes between processes.
+    # Pin each category list to the column order the model was trained with.
+    frozen = {}
+    for column, categories in dummy_info.items():
+        trained = [name for name in feature_order if name in categories]
+        extra = sorted(name for name in categories if name not in trained)
+        frozen[column] = tuple(trained + extra)
+    return MappingProxyType(frozen)
+
+
+def _load(model_dir, version):
+    loaded = {}
+    for key, path in _artifact_paths(model_dir).items():
+        with open(path, "rb") as f:
+            loaded[key] = pickle.load(f)
+
+    feature_order = tuple(loaded["feature_order"])
+    return ModelBundle(
+        model=loaded["model"],
+        preprocessor=loaded["preprocessor"],
+        dummy_info=_freeze_dummy_info(loaded["dummy_info"], feature_order),
+        feature_order=feature_order,
+        version=version,
+    )
+
+
+def _resolve(model_dir):
+    """``(version, from_artifact)`` for what is on disk.
+
+    The artifact directory is used when it was exported from the pickles next to
+    it, or when there are no pickles; a stale one is skipped with a warning.
+    """
+    manifest_version = None
+    if os.path.exists(_manifest_path(model_dir)):
+        with open(_manifest_path(model_dir)) as f:
+            manifest_version = json.load(f)["version"]
+    if not all(os.path.exists(path) for path in _artifact_paths(model_dir).values()):
+        if manifest_version is None:
+            raise FileNotFoundError(f"No model pickles or {ARTIFACT_DIR}/{MANIFEST_FILE} in {model_dir}")
+        return manifest_version, True
+
+    version = _checksum(model_dir)
+    if manifest_version is not None and manifest_version != version:
+        warnings.warn(f"{ARTIFACT_DIR}/ was exported from other pickles ({manifest_version}); loading the pickles ({version})")
+    return version, manifest_version == version
+
+
+def load_pickles(model_dir=MODEL_DIR):
+    """The bundle straight from the pickles, fitted preprocessor included (for training and parity checks)."""
+    return _load(model_dir, _checksum(model_dir))
+
+
+def get_model_bundle(model_dir=MODEL_DIR):
+    """Return the process-wide bundle, reloading only if the files on disk changed."""
+    signature = _stat_signature(model_dir)
+    with _lock:
+        cached = _bundles.get(model_dir)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        version, from_artifact = _resolve(model_dir)
+        if cached is not None and cached[1].version == version:
+            # Files were touched but their content is identical.
+            _bundles[model_dir] = (signature, cached[1])
+            return cached[1]
+
+        if from_artifact:
+            from core.artifact import load_artifact
+
+            bundle = load_artifact(os.path.join(model_dir, ARTIFACT_DIR))
+        else:
+            bundle = _load(model_dir, version)
+        _bundles[model_dir] = (signature, bundle)
+        return bundle
+
+
+_versions = {}
+
+
+def current_version(model_dir=MODEL_DIR):
+    """Version of the model on disk, without loading it; equals the loaded bundle's ``version``."""
+    signature = _stat_signature(model_dir)
+    with _lock:
+        cached = _bundles.get(model_dir)
+        if cached is not None and cached[0] == signature:
+            return cached[1].version
+        cached = _versions.get(model_dir)
+        if cached is None or cached[0] != signature:
+            cached = (signature, _resolve(model_dir)[0])
+            _versions[model_dir] = cached
+        return cached[1]
+
+
+def warm_up(model_dir=MODEL_DIR, background=False):
+    """Load the bundle ahead of the first prediction.
+
+    With ``background=True`` the load runs in a daemon thread so the calling page
+    renders immediately; repeated calls while a load is running are no-ops.
+    """
+    global _warm_up_thread
+    if not background:
+        return get_model_bundle(model_dir)
+
+    with _lock:
+        if model_dir in _bundles or (_warm_up_thread is not None and _warm_up_thread.is_alive()):
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(
+            target=get_model_bundle, args=(model_dir,), name="model-warm-up", daemon=True
+        )
+        _warm_up_thread.start()
+        return _warm_up_thread
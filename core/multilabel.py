@@ -0,0 +1,93 @@
+import ast
+
+import numpy as np
+
+
+def parse_multilabel(value):
+    """Turn a multiselect value (list, array, or its str() form) into a list."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    if isinstance(value, str):
+        return ast.literal_eval(value)
+    return []
+
+
+def _cell_key(value):
+    # Strings are hashable as-is; native lists become tuples so identical cells share a code
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(value)
+    return None
+
+
+class MultiLabelEncoder:
+    """Indicator encoding for the list-valued ``recycling`` / ``cooking_with`` columns.
+
+    Each distinct cell is parsed once and turned into an indicator row; the output
+    is then a single NumPy gather over the per-row codes, so the cost no longer
+    scales with rows x categories of Python-level parsing. Works the same on
+    stringified lists (the survey export) and native lists (the app).
+    """
+
+    def __init__(self, categories=None):
+        self.categories = categories
+
+    def _factorize(self, values):
+        codes = np.empty(len(values), dtype=np.intp)
+        uniques = {}
+        for i, value in enumerate(values):
+            key = _cell_key(value)
+            code = uniques.get(key)
+            if code is None:
+                code = uniques[key] = len(uniques)
+            codes[i] = code
+        return codes, [parse_multilabel(key) if key is not None else [] for key in uniques]
+
+    def fit(self, values=None):
+        if self.categories is None:
+            _, parsed = self._factorize(values)
+            self.categories_ = tuple(sorted({label for labels in parsed for label in labels}))
+        else:
+            self.categories_ = tuple(self.categories)
+        return self
+
+    def transform(self, values, sparse=False):
+        codes, parsed = self._factorize(values)
+        position = {category: j for j, category in enumerate(self.categories_)}
+
+        table = np.zeros((len(parsed), len(self.categories_)), dtype=np.int8)
+        for i, labels in enumerate(parsed):
+            for label in labels:
+                j = position.get(label)
+                if j is not None:
+                    table[i, j] = 1
+
+        if sparse:
+            from scipy import sparse as sp
+            return sp.csr_matrix(table)[codes]
+        return table[codes]
+
+    def fit_transform(self, values, sparse=False):
+        return self.fit(values).transform(values, sparse=sparse)
+
+    def get_feature_names_out(self):
+        return list(self.categories_)
+
+
+def expand_multilabel(df, column_name, categories=None):
+    """DataFrame helper used by training: replaces ``column_name`` with one 0/1 column per category.
+
+    Returns ``(df, categories)`` so the categories learned on the training split
+    can be reused for the test split and saved to dummy_info.pkl.
+    """
+    import pandas as pd
+
+    encoder = MultiLabelEncoder(categories).fit(df[column_name])
+    indicators = pd.DataFrame(
+        encoder.transform(df[column_name]).astype(np.int64),
+        columns=encoder.get_feature_names_out(),
+        index=df.index,
+    )
+    df = pd.concat([df.drop(columns=column_name), indicators], axis=1)
+    return df, encoder.categories_
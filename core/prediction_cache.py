@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.fast_path import select_model
+from core.features import get_feature_encoder
+from core.lean_scoring import get_lean_scorer
+from core.lookup_table import table_predictions
+from core.model_bundle import get_model_bundle
+
+
+class PredictionCache:
+    """Thread-safe LRU of model outputs keyed on the encoded feature row.
+
+    Every lookup carries the bundle version; the whole cache is dropped the first
+    time a different version is seen, so a retrained model never serves stale
+    predictions.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(row):
+        return np.ascontiguousarray(row, dtype=np.float64).tobytes()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, row):
+        key = self._key(row)
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, row, value):
+        key = self._key(row)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "version": self._version,
+            }
+
+
+prediction_cache = PredictionCache()
+
+
+def predict_profile(input_data, bundle=None, cache=prediction_cache):
+    """Predict one input_data dict, skipping the model for profiles seen before.
+
+    Without an explicit bundle, a linear model compiled by ``core.lean_scoring``
+    is scored without loading the pickles.
+    """
+    if bundle is None:
+        scorer = get_lean_scorer()
+        if scorer is not None:
+            return _cached_predict(scorer, scorer.encoder.encode(input_data), scorer.version, cache)
+        bundle = get_model_bundle()
+    prediction, = table_predictions(bundle, [input_data])
+    if prediction is not None:
+        return prediction
+    row = get_feature_encoder(bundle).encode(input_data)
+    model, tag = select_model(bundle)
+    return _cached_predict(model, row, tag, cache)
+
+
+def _cached_predict(model, row, tag, cache):
+    cached = cache.get(tag, row)
+    if cached is not None:
+        return cached
+    prediction = float(model.predict(row)[0])
+    cache.put(tag, row, prediction)
+    return prediction
@@ -0,0 +1,245 @@
+"""Where a footprint falls in the population, from compact quantile sketches.
+
+Build the population sketches from the training split of the survey:
+    python -m core.quantiles "Carbon Emission.csv"
+
+Each sketch is a log-bucketed histogram: a value lands in bucket
+``ceil(log(x) / log(gamma))``, so any quantile it reports is within
+``RELATIVE_ACCURACY`` of the true value, it takes a few hundred counters
+whatever the number of rows, and two sketches merge by adding counts. Ranks
+are a binary search over the cumulative counts.
+
+There is one sketch for everyone and one per diet, transport and heating
+source. The training-data sketches are saved to models/population_sketch.npz;
+the prediction history gets its own set, stored in the history database and
+brought up to date incrementally from the rows added since its last update.
+The history sketches hold one value per profile, its latest prediction, so
+tracking again replaces a profile's value instead of adding another person.
+"""
+import argparse
+import io
+import math
+import os
+import threading
+
+import numpy as np
+
+from core.history import history_store
+
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 1.0
+MAX_VALUE = 1e6
+SEGMENT_FIELDS = ("diet", "transport", "heating_energy_source")
+OVERALL = "all"
+SKETCH_FILE = "population_sketch.npz"
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_N_BUCKETS = int(math.ceil(math.log(MAX_VALUE) / _LOG_GAMMA)) + 1
+
+
+def segment_keys(input_data):
+    """The sketches a profile belongs to: everyone, plus one per segment field."""
+    return [OVERALL] + [f"{field}={input_data.get(field)}" for field in SEGMENT_FIELDS]
+
+
+class QuantileSketch:
+    """Mergeable log-bucket histogram of positive values (values below MIN_VALUE share bucket 0)."""
+
+    def __init__(self, counts=None):
+        self.counts = np.zeros(_N_BUCKETS, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self._cumulative = None
+
+    @staticmethod
+    def bucket(values):
+        values = np.clip(np.asarray(values, dtype=np.float64), MIN_VALUE, MAX_VALUE)
+        return np.ceil(np.log(values) / _LOG_GAMMA).astype(np.intp)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, values, weight=1):
+        """Count ``values`` in (``weight=-1``: take them back out of) the sketch."""
+        np.add.at(self.counts, self.bucket(np.atleast_1d(values)), weight)
+        self._cumulative = None
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self._cumulative = None
+        return self
+
+    def __add__(self, other):
+        return QuantileSketch(self.counts + other.counts)
+
+    def _cumsum(self):
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.counts)
+        return self._cumulative
+
+    def rank(self, value):
+        """Fraction of values at or below ``value`` (values in its own bucket count half)."""
+        total = self.count
+        if not total:
+            return None
+        cumulative = self._cumsum()
+        b = int(self.bucket(value))
+        below = cumulative[b - 1] if b > 0 else 0
+        return float((below + 0.5 * self.counts[b]) / total)
+
+    def quantile(self, q):
+        cumulative = self._cumsum()
+        if not cumulative[-1]:
+            return None
+        b = int(np.searchsorted(cumulative, q * cumulative[-1], side="left"))
+        # Bucket b holds (gamma^(b-1), gamma^b]; report the value with the same relative error both ways
+        return float(2 * _GAMMA ** b / (_GAMMA + 1))
+
+
+class SketchSet:
+    """``{segment key: QuantileSketch}`` with whole-set merge and (de)serialisation."""
+
+    def __init__(self, sketches=None):
+        self.sketches = dict(sketches or {})
+
+    def get(self, key):
+        return self.sketches.get(key) or QuantileSketch()
+
+    def add(self, input_data, value):
+        for key in segment_keys(input_data):
+            self.sketches.setdefault(key, QuantileSketch()).add(value)
+
+    def add_frame(self, df, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.sketches.setdefault(OVERALL, QuantileSketch()).add(values)
+        for field in SEGMENT_FIELDS:
+            if field not in df.columns:
+                continue
+            labels = df[field].astype(str).to_numpy()
+            for label in np.unique(labels):
+                self.sketches.setdefault(f"{field}={label}", QuantileSketch()).add(values[labels == label])
+
+    def __add__(self, other):
+        keys = set(self.sketches) | set(other.sketches)
+        return SketchSet({key: self.get(key) + other.get(key) for key in keys})
+
+    def to_bytes(self):
+        out = io.BytesIO()
+        np.savez_compressed(out, **{key: sketch.counts for key, sketch in self.sketches.items()})
+        return out.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls({key: QuantileSketch(arrays[key]) for key in arrays.files})
+
+
+# --- Training population ---
+def build_population(survey_path, out_path=None):
+    """Sketch the carbon_emission labels of the training split and save them."""
+    from core.dataset import clean_survey, load_survey, split_survey
+    from core.model_bundle import MODEL_DIR
+
+    X_train, _, y_train, _ = split_survey(clean_survey(load_survey(survey_path)))
+    population = SketchSet()
+    population.add_frame(X_train, y_train.to_numpy())
+    out_path = out_path or os.path.join(MODEL_DIR, SKETCH_FILE)
+    with open(f"{out_path}.tmp", "wb") as f:
+        f.write(population.to_bytes())
+    os.replace(f"{out_path}.tmp", out_path)
+    return population
+
+
+_population = {}
+_population_lock = threading.Lock()
+
+
+def load_population(path=None):
+    """The saved training-data sketches (empty if they have not been built); re-read when the file changes."""
+    from core.model_bundle import MODEL_DIR
+
+    path = path or os.path.join(MODEL_DIR, SKETCH_FILE)
+    if not os.path.exists(path):
+        return SketchSet()
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _population_lock:
+        population = _population.get(key)
+        if population is None:
+            with open(path, "rb") as f:
+                population = SketchSet.from_bytes(f.read())
+            _population.clear()
+            _population[key] = population
+        return population
+
+
+# --- Prediction history ---
+class HistorySketches:
+    """Sketches of each profile's latest prediction in a HistoryStore, advanced by the rows added since the last update."""
+
+    name = "profile_quantile_sketches"
+
+    def __init__(self, store=history_store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._sketches = SketchSet()
+        self._last_id = 0
+
+    def _fold(self, rows, weight):
+        if not rows:
+            return
+        values, *segments = zip(*rows)
+        values = np.asarray(values, dtype=np.float64)
+        self._sketches.sketches.setdefault(OVERALL, QuantileSketch()).add(values, weight)
+        for field, labels in zip(SEGMENT_FIELDS, segments):
+            labels = np.asarray([str(label) for label in labels])
+            for label in np.unique(labels):
+                self._sketches.sketches.setdefault(f"{field}={label}", QuantileSketch()).add(values[labels == label], weight)
+
+    def refresh(self):
+        """Fold in predictions recorded since the last refresh (by any process), persist, and return the SketchSet."""
+        with self._lock:
+            saved = self.store.load_state(self.name)
+            if saved and saved[0] > self._last_id:
+                self._last_id, self._sketches = saved[0], SketchSet.from_bytes(saved[1])
+
+            last_id = self.store.last_id()
+            if last_id > self._last_id:
+                # Profiles that tracked since: out with their previous latest value, in with the new one
+                self._fold(self.store.latest_per_profile(self._last_id, last_id, self._last_id, SEGMENT_FIELDS), -1)
+                self._fold(self.store.latest_per_profile(self._last_id, last_id, last_id, SEGMENT_FIELDS), 1)
+                self._last_id = last_id
+                self.store.save_state(self.name, self._last_id, self._sketches.to_bytes())
+            return self._sketches
+
+
+history_sketches = HistorySketches()
+
+
+def percentiles(input_data, prediction, population=None, history=None, min_count=30):
+    """``[(segment key, share of people at or below prediction, count), ...]`` for each segment with enough data."""
+    combined = (population if population is not None else load_population()) + (history or SketchSet())
+    results = []
+    for key in segment_keys(input_data):
+        sketch = combined.get(key)
+        if sketch.count >= min_count:
+            results.append((key, sketch.rank(prediction), sketch.count))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the population quantile sketches from the survey's training split.")
+    parser.add_argument("survey", help="Survey export (CSV or Parquet) with carbon_emission labels")
+    parser.add_argument("--output", default=None, help=f"Where to write the sketches (default: models/{SKETCH_FILE})")
+    args = parser.parse_args(argv)
+
+    population = build_population(args.survey, args.output)
+    overall = population.get(OVERALL)
+    size = len(population.to_bytes())
+    print(f"Sketched {overall.count:,} training rows into {len(population.sketches)} segments ({size:,} bytes)")
+    print("Overall quantiles: " + ", ".join(f"p{int(q * 100)} {overall.quantile(q):.0f}" for q in (0.1, 0.25, 0.5, 0.75, 0.9)))
+
+
+if __name__ == "__main__":
+    main()
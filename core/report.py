@@ -0,0 +1,319 @@
+"""Rendering of the personalised dashboard report as HTML, PDF or plain text.
+
+Usage:
+    python -m core.report            # render a sample report and check every section made it in
+
+The report is one Jinja2 template (templates/report.html) rendered either as a
+standalone HTML page or as the HTML subset fpdf2 lays out into a PDF; a sibling
+templates/report.txt gives the plain-text version. All text is cleaned when it
+is added to the report, so the renderers never post-process their output.
+"""
+import functools
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from datetime import date
+from typing import NamedTuple
+
+from core import schema
+from core.charts import contributions_png, png_data_uri, vehicle_distance_png, waste_png
+from core.feedback_rules import evaluate as evaluate_feedback
+from core.multilabel import parse_multilabel
+
+TITLE = "Your Personalized Carbon Dashboard"
+
+RECOMMENDATIONS = [
+    "Consider reducing meat consumption or adopting a more plant-based diet",
+    "Use public transportation, carpooling, or biking instead of driving alone",
+    "Reduce waste by composting food scraps and recycling more materials",
+    "Invest in energy-efficient appliances and LED lighting",
+    "Reduce water usage with shorter showers and water-saving fixtures",
+    "Buy local and seasonal products to reduce transportation emissions",
+    "Choose sustainable and durable clothing options, shop less frequently",
+]
+
+FOOTER = ("This report is generated based on your provided information. "
+          "For a more detailed analysis, consult with an environmental expert.")
+
+# Same colours as the old HTML report's CSS classes
+LEVEL_COLORS = {
+    "success": "#008000",
+    "warning": "#FF8C00",
+    "error": "#FF0000",
+    "info": "#0000FF",
+}
+HEADING_COLOR = "#1976D2"
+TITLE_COLOR = "#2E7D32"
+MUTED_COLOR = "#666666"
+
+# Chart width in px (HTML) / PDF points scaled by write_html
+CHART_WIDTH = 340
+
+TOP_DRIVERS = 6
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Pictographs, flags, dingbats, plus the joiners/variation selectors that glue emoji sequences together
+_EMOJI = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"
+    "\U00002600-\U000027BF"
+    "\U0000FE00-\U0000FE0F"
+    "\U0000200D"
+    "]+"
+)
+# The PDF core fonts only cover Latin-1
+_PUNCTUATION = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-"})
+
+
+def clean_text(value):
+    """Strip emoji and map typographic punctuation so the text is safe for every output format."""
+    text = _EMOJI.sub("", str(value)).translate(_PUNCTUATION)
+    return " ".join(text.encode("latin-1", "ignore").decode("latin-1").split())
+
+
+class ReportItem(NamedTuple):
+    kind: str  # "fact", "chart" or "feedback"
+    text: str  # fact label, chart alt text or feedback message
+    value: object = None  # fact value, chart PNG bytes or feedback level
+    icon: str = ""  # emoji shown on screen only; never rendered into reports
+
+
+@dataclass
+class ReportSection:
+    """One dashboard section: facts, charts and feedback lines, in display order."""
+    title: str
+    icon: str = ""
+    items: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self.title = clean_text(self.title)
+
+    def fact(self, label, value):
+        self.items.append(ReportItem("fact", clean_text(label), clean_text(value)))
+
+    def chart(self, png, alt=""):
+        self.items.append(ReportItem("chart", clean_text(alt), png))
+
+    def feedback(self, level, text, icon=""):
+        self.items.append(ReportItem("feedback", clean_text(text), level, icon))
+
+
+@dataclass
+class DashboardReport:
+    prediction: float
+    sections: list = field(default_factory=list)
+    generated_on: date = field(default_factory=date.today)
+
+    def section(self, title, icon=""):
+        section = ReportSection(title, icon)
+        self.sections.append(section)
+        return section
+
+    def strings(self):
+        """Every piece of text the rendered report must contain."""
+        yield TITLE
+        for section in self.sections:
+            yield section.title
+            for item in section.items:
+                if item.kind == "fact":
+                    yield f"{item.text}: {item.value}"
+                elif item.kind == "feedback":
+                    yield item.text
+        yield from RECOMMENDATIONS
+
+
+# --- Rendering ---
+@functools.lru_cache(maxsize=None)
+def _environment():
+    # Imported on first render, not when the dashboard imports this module
+    import jinja2
+
+    # Loaded and compiled once per process; auto_reload is off so renders never stat the files
+    environment = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=jinja2.select_autoescape(["html"]),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+    )
+    environment.filters["data_uri"] = png_data_uri
+    return environment
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(name):
+    return _environment().get_template(name)
+
+
+def _context(report, pdf=False):
+    return {
+        "report": report,
+        "pdf": pdf,
+        "title": TITLE,
+        "recommendations": RECOMMENDATIONS,
+        "footer": FOOTER,
+        "colors": LEVEL_COLORS,
+        "title_color": TITLE_COLOR,
+        "heading_color": HEADING_COLOR,
+        "muted_color": MUTED_COLOR,
+        "chart_width": CHART_WIDTH,
+    }
+
+
+def render_html(report):
+    return get_template("report.html").render(_context(report))
+
+
+def render_text(report):
+    return get_template("report.txt").render(_context(report))
+
+
+def render_pdf(report):
+    """Render a DashboardReport to PDF bytes without touching disk or spawning a process."""
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_margins(18, 18, 18)
+    pdf.set_auto_page_break(True, margin=18)
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=11)
+    pdf.write_html(get_template("report.html").render(_context(report, pdf=True)))
+    return bytes(pdf.output())
+
+
+# --- Checking rendered output ---
+_TEXT_OP = re.compile(rb"\(((?:\\.|[^\\)])*)\)\s*Tj")
+_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+
+
+def pdf_text(pdf_bytes):
+    """The text drawn by a PDF made with render_pdf, one space between drawn runs."""
+    runs = []
+    for raw in _STREAM.findall(pdf_bytes):
+        try:
+            content = zlib.decompress(raw)
+        except zlib.error:
+            content = raw
+        for match in _TEXT_OP.findall(content):
+            runs.append(re.sub(rb"\\(.)", rb"\1", match).decode("latin-1"))
+    return " ".join(" ".join(runs).split())
+
+
+def missing_strings(report, pdf_bytes):
+    """Report strings that do not appear in the rendered PDF (wrapped lines are rejoined)."""
+    text = pdf_text(pdf_bytes).replace(" ", "")
+    return [s for s in report.strings() if s.replace(" ", "") not in text]
+
+
+# --- Building a report from a profile ---
+def build_report(input_data, prediction, charts=True, feedback=None, explanation=None):
+    """The dashboard's sections, facts, charts and feedback for one input_data profile.
+
+    ``feedback`` and ``explanation`` are this profile's ``feedback_rules.evaluate``
+    and ``attributions`` results when they were already worked out in bulk;
+    otherwise they are computed here.
+    """
+    if feedback is None:
+        feedback = evaluate_feedback(input_data)
+    if explanation is None:
+        from core.attributions import explain
+
+        explanation = explain(input_data)
+    report = DashboardReport(prediction=prediction)
+
+    personal = report.section("Personal Profile", "🚶‍♂️")
+    personal.fact("Sex", input_data.get('gender', 'Unknown'))
+    personal.fact("Body Type", input_data.get('body_type', 'Unknown'))
+    personal.fact("Diet", input_data.get('diet', 'Unknown'))
+    personal.feedback(*feedback["diet"])
+    personal.fact("Social Activity", input_data.get('social_activity', 'Unknown'))
+    personal.feedback(*feedback["social_activity"])
+    personal.fact("Shower Frequency", input_data.get('shower_frequency', 'Unknown'))
+    personal.feedback(*feedback["shower_frequency"])
+
+    transport = report.section("Transport Overview", "🚗")
+    vehicle_distance = input_data.get('vehicle_monthly_distance_km', 0)
+    transport.fact("Vehicle Monthly Distance", f"{vehicle_distance} km")
+    if charts:
+        transport.chart(vehicle_distance_png(vehicle_distance), "Vehicle Distance Graph")
+    transport.feedback(*feedback["vehicle_distance"])
+    transport.fact("Air Travel Frequency", input_data.get('air_travel_frequency', 'never'))
+    transport.feedback(*feedback["air_travel"])
+
+    waste = report.section("Waste Management", "🗑")
+    waste_bag_count = input_data.get('waste_bag_weekly_count', 0)
+    try:
+        recycling = parse_multilabel(input_data.get('recycling', []))
+    except (ValueError, SyntaxError):
+        recycling = []
+    waste.fact("Waste Bags per Week", waste_bag_count)
+    waste.fact("Recycling Materials", ', '.join(recycling) if recycling else 'None')
+    if charts:
+        waste.chart(waste_png(waste_bag_count, len(recycling)), "Waste Management Graph")
+    waste.feedback(*feedback["waste_bags"])
+    waste.feedback(*feedback["recycling"])
+
+    energy = report.section("Energy Usage", "⚡")
+    energy.fact("Heating Energy Source", input_data.get('heating_energy_source', 'Unknown'))
+    energy.feedback(*feedback["heating"])
+    energy.fact("Energy Efficiency Devices", input_data.get('energy_efficiency', 'Unknown'))
+    energy.feedback(*feedback["energy_efficiency"])
+    energy.fact("Daily PC/TV Hours", f"{input_data.get('tv_pc_daily_hours', 0)} hours")
+    energy.feedback(*feedback["screen_time"])
+    energy.fact("Daily Internet Hours", f"{input_data.get('internet_daily_hours', 0)} hours")
+    energy.feedback(*feedback["internet"])
+
+    consumption = report.section("Consumption", "🛒")
+    consumption.fact("Monthly Grocery Bill", f"${input_data.get('monthly_grocery_bill', 0)}")
+    consumption.feedback(*feedback["grocery_bill"])
+    consumption.fact("New Clothes Bought Monthly", f"{input_data.get('new_clothes_monthly', 0)} items")
+    consumption.feedback(*feedback["clothes"])
+
+    drivers = report.section("What Drives Your Estimate", "🧮")
+    top = [(field, contribution) for field, contribution in explanation.top(TOP_DRIVERS) if round(contribution, 2)]
+    if charts and top:
+        drivers.chart(
+            contributions_png([schema.FIELD_LABELS[field] for field, _ in top], [c for _, c in top]),
+            "Contribution Graph",
+        )
+    for field, contribution in top:
+        drivers.fact(schema.FIELD_LABELS[field], f"{contribution:+.2f} units")
+    drivers.feedback(
+        "info",
+        f"Compared with an average profile ({explanation.baseline:.2f} units), these answers moved the model's "
+        "estimate the most. Positive values raise it; negative values lower it.",
+        "🧮",
+    )
+
+    return report
+
+
+SAMPLE_PROFILE = {
+    'height': 165, 'weight': 60, 'body_type': 'normal', 'gender': 'Female', 'diet': 'vegan',
+    'shower_frequency': 'daily', 'heating_energy_source': 'natural gas', 'transport': 'private',
+    'social_activity': 'often', 'monthly_grocery_bill': 120, 'air_travel_frequency': 'rarely',
+    'vehicle_monthly_distance_km': 1200, 'waste_bag_size': 'medium', 'waste_bag_weekly_count': 4,
+    'tv_pc_daily_hours': 6, 'new_clothes_monthly': 3, 'internet_daily_hours': 5, 'energy_efficiency': 'Yes',
+    'recycling': ['Paper', 'Glass'], 'cooking_with': ['Stove', 'Microwave'],
+}
+
+
+def sample_report():
+    return build_report(SAMPLE_PROFILE, 2246.35)
+
+
+if __name__ == "__main__":
+    report = sample_report()
+    pdf_bytes = render_pdf(report)
+    missing = missing_strings(report, pdf_bytes)
+    print(f"Rendered {len(pdf_bytes):,} bytes; {len(list(report.strings())) - len(missing)} of "
+          f"{len(list(report.strings()))} report strings found")
+    if missing:
+        raise SystemExit(f"Missing from PDF: {missing}")
+    import html
+
+    for name, rendered in (("HTML", html.unescape(re.sub(r"<[^>]+>", "", render_html(report)))), ("text", render_text(report))):
+        absent = [s for s in report.strings() if s not in rendered]
+        if absent:
+            raise SystemExit(f"Missing from {name}: {absent}")
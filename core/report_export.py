@@ -0,0 +1,222 @@
+"""Bulk per-respondent report export.
+
+Usage:
+    python -m core.report_export "Carbon Emission.csv" reports.zip
+    python -m core.report_export profiles.jsonl reports/ --format pdf html --workers 4 --id-column respondent_id
+
+Rows are scored a chunk at a time with the vectorized batch path, then each
+row's dashboard report is rendered in a process pool. Output goes to a
+directory (one file per report) or a ZIP archive. Rerunning the same command
+after an interruption skips the reports that were already written: files that
+exist in a directory, or finished chunks of a ZIP (each chunk is staged as its
+own part archive named by its row range, and the parts are merged once every
+chunk is done). The input's checksum and the settings that decide which report
+holds which row are recorded next to the partial output; resuming with a
+different input, --chunksize (ZIP), --id-column or --format is refused.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from core.attributions import explain_table, get_explainer
+from core.batch import BatchReport, iter_chunks, normalize_columns, score_frame
+from core.fast_path import select_model
+from core.feedback_rules import evaluate_codes, outcomes_from_codes
+from core.lookup_table import select_table
+from core.model_bundle import get_model_bundle
+from core.report import build_report, render_html, render_pdf, render_text
+
+RENDERERS = {"pdf": render_pdf, "html": render_html, "txt": render_text}
+MANIFEST_FILE = ".export_manifest.json"
+
+
+def _render_one(args):
+    name, input_data, prediction, feedback, explanation, formats = args
+    report = build_report(
+        input_data, prediction, charts="pdf" in formats or "html" in formats, feedback=feedback, explanation=explanation,
+    )
+    rendered = []
+    for fmt in formats:
+        data = RENDERERS[fmt](report)
+        rendered.append((f"{name}.{fmt}", data.encode() if isinstance(data, str) else data))
+    return rendered
+
+
+def _record_names(chunk, offset, id_column):
+    if id_column:
+        if id_column not in chunk.columns:
+            raise ValueError(f"--id-column {id_column!r} is not a column of the input")
+        return [f"report-{value}" for value in chunk[id_column]]
+    return [f"report-{offset + i:07d}" for i in range(len(chunk))]
+
+
+def _input_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _claim(directory, settings, started):
+    """Record ``settings`` in ``directory``, or refuse to resume output that was started with different ones."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            recorded = json.load(f)
+        changed = [key for key in settings if recorded.get(key) != settings[key]]
+        if changed:
+            raise ValueError(f"{directory} holds a partial export made with a different {', '.join(changed)}; "
+                             "refusing to resume it. Delete it to start over.")
+        return
+    if started:
+        raise ValueError(f"{directory} already holds reports from an export with no recorded settings; "
+                         "delete it to start over.")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(settings, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+class _DirectoryOutput:
+    """One file per report; a report counts as done once its last format is on disk."""
+
+    def __init__(self, path, formats, settings):
+        self.path = path
+        self.formats = formats
+        os.makedirs(path, exist_ok=True)
+        # Reports are named by id or row number, so the chunk size does not matter here
+        settings = {key: value for key, value in settings.items() if key != "chunksize"}
+        _claim(path, settings, any(name.startswith("report-") for name in os.listdir(path)))
+
+    def pending(self, start, names):
+        return [i for i, name in enumerate(names)
+                if not os.path.exists(os.path.join(self.path, f"{name}.{self.formats[-1]}"))]
+
+    def write(self, start, names, files):
+        for filename, data in files:
+            target = os.path.join(self.path, filename)
+            tmp = f"{target}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+
+    def close(self):
+        pass
+
+
+class _ZipOutput:
+    """Chunks are staged as part archives (named by row range) next to the target and merged at the end."""
+
+    def __init__(self, path, formats, settings):
+        self.path = path
+        self.parts_dir = f"{path}.parts"
+        os.makedirs(self.parts_dir, exist_ok=True)
+        _claim(self.parts_dir, settings, any(name.endswith(".zip") for name in os.listdir(self.parts_dir)))
+
+    def _part(self, start, names):
+        return os.path.join(self.parts_dir, f"part-{start:09d}-{start + len(names):09d}.zip")
+
+    def pending(self, start, names):
+        return [] if os.path.exists(self._part(start, names)) else list(range(len(names)))
+
+    def write(self, start, names, files):
+        part = self._part(start, names)
+        tmp = f"{part}.tmp"
+        # PDFs and PNG-laden HTML are already compressed; storing keeps the merge a plain copy
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as archive:
+            for filename, data in files:
+                archive.writestr(filename, data)
+        os.replace(tmp, part)
+
+    def close(self):
+        parts = sorted(name for name in os.listdir(self.parts_dir) if name.endswith(".zip"))
+        tmp = f"{self.path}.tmp"
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as archive:
+            for part in parts:
+                with zipfile.ZipFile(os.path.join(self.parts_dir, part)) as source:
+                    for info in source.infolist():
+                        archive.writestr(info, source.read(info))
+        os.replace(tmp, self.path)
+        shutil.rmtree(self.parts_dir)
+
+
+def export_reports(input_path, output, formats=("pdf",), chunksize=1_000, workers=None, id_column=None, log=None):
+    """Score and render a report for every row of ``input_path``; returns a BatchReport of reports written."""
+    formats = list(formats)
+    unknown = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown:
+        raise ValueError(f"Unknown report formats {unknown}; expected some of {list(RENDERERS)}")
+
+    settings = {"input": _input_checksum(input_path), "chunksize": chunksize, "id_column": id_column, "formats": formats}
+    writer = (_ZipOutput if output.lower().endswith(".zip") else _DirectoryOutput)(output, formats, settings)
+    bundle = get_model_bundle()
+    explainer = get_explainer(bundle, *select_model(bundle))
+    lookup = select_table(bundle)
+    written = skipped = offset = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in iter_chunks(input_path, chunksize):
+            # Ids are looked up after raw survey headers have been renamed
+            chunk = normalize_columns(chunk)
+            start_row = offset
+            names = _record_names(chunk, offset, id_column)
+            offset += len(chunk)
+            todo = writer.pending(start_row, names)
+            skipped += len(names) - len(todo)
+            if not todo:
+                continue
+
+            chunk = chunk.iloc[todo]
+            predictions = score_frame(chunk, bundle)
+            # Feedback rules and attributions are worked out for the whole chunk at once, not per report,
+            # and explain the model score_frame used so each report's contributions add up to its estimate
+            codes = evaluate_codes(chunk)
+            records = chunk.to_dict("records")
+            explanations = explainer.explain_frame(chunk)
+            if lookup is not None:
+                # Rows the lookup table scored are explained from the table
+                explanations = [explain_table(lookup, record) or explanation
+                                for record, explanation in zip(records, explanations)]
+            jobs = [
+                (names[i], record, float(prediction), outcomes_from_codes(codes, row), explanations[row], formats)
+                for row, (i, record, prediction) in enumerate(zip(todo, records, predictions))
+            ]
+            files = []
+            for rendered in executor.map(_render_one, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))):
+                files.extend(rendered)
+            writer.write(start_row, names, files)
+            written += len(jobs)
+            if log:
+                elapsed = time.perf_counter() - start
+                log(f"{written:,} reports written ({written / elapsed:,.1f} reports/sec), {skipped:,} already done")
+    writer.close()
+    return BatchReport(rows=written, seconds=time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a dashboard report for every profile in a survey export.")
+    parser.add_argument("input", help="CSV, Parquet or JSON Lines file of input_data-shaped records")
+    parser.add_argument("output", help="Output directory, or a path ending in .zip")
+    parser.add_argument("--format", nargs="+", choices=list(RENDERERS), default=["pdf"], dest="formats")
+    parser.add_argument("--chunksize", type=int, default=1_000, help="Rows scored and checkpointed together (default: 1000)")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: all cores)")
+    parser.add_argument("--id-column", default=None, help="Column used to name each report (default: row number)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda message: print(message, file=sys.stderr))
+    report = export_reports(
+        args.input, args.output, formats=args.formats, chunksize=args.chunksize,
+        workers=args.workers, id_column=args.id_column, log=log,
+    )
+    print(f"Wrote {report.rows:,} reports in {report.seconds:.2f}s ({report.rows_per_sec:,.1f} reports/sec) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
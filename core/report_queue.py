@@ -0,0 +1,184 @@
+"""Background PDF rendering for the dashboard.
+
+Usage:
+    python -m core.report_queue --jobs 50 --workers 2     # burst-test the queue and print its timing metrics
+"""
+import argparse
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from core.report import render_pdf
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class ReportJob:
+    id: int
+    report: object
+    status: str = QUEUED
+    submitted: float = field(default_factory=time.perf_counter)
+    started: float = None
+    finished: float = None
+    result: bytes = None
+    error: str = None
+
+    @property
+    def pending(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def queue_seconds(self):
+        return (self.started or time.perf_counter()) - self.submitted
+
+    @property
+    def render_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class ReportQueue:
+    """Renders PDF reports on a fixed set of worker threads fed by a bounded queue.
+
+    ``workers`` caps how many reports render at once; ``max_queued`` caps how many
+    may wait, and ``submit`` raises ``queue.Full`` beyond that so a burst of clicks
+    is turned away instead of piling up. Finished jobs (and their PDF bytes) are
+    kept for the most recent ``keep`` submissions.
+    """
+
+    def __init__(self, workers=2, max_queued=32, keep=256, render=render_pdf):
+        self.workers = workers
+        self.keep = keep
+        self.render = render
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._queue_times = deque(maxlen=500)
+        self._render_times = deque(maxlen=500)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _start(self):
+        # Threads are started on first use so importing the module stays cheap
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"report-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, report):
+        with self._lock:
+            self._start()
+            job = ReportJob(id=next(self._ids), report=report)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job):
+        """1-based place of a queued job in line, or 0 once it has started."""
+        if job.status != QUEUED:
+            return 0
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == QUEUED and other.id <= job.id)
+
+    def expected_render_seconds(self):
+        with self._lock:
+            return float(np.mean(self._render_times)) if self._render_times else None
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.started = time.perf_counter()
+            job.status = RUNNING
+            try:
+                job.result = self.render(job.report)
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            job.finished = time.perf_counter()
+            job.report = None  # the PDF is all that is needed from here on
+            with self._lock:
+                if job.status == DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._queue_times.append(job.started - job.submitted)
+                self._render_times.append(job.finished - job.started)
+            self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            def summary(times):
+                if not times:
+                    return {"mean_ms": 0.0, "p95_ms": 0.0}
+                ms = np.array(times) * 1000
+                return {"mean_ms": float(ms.mean()), "p95_ms": float(np.percentile(ms, 95))}
+
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "max_queued": self._queue.maxsize,
+                "running": sum(1 for job in self._jobs.values() if job.status == RUNNING),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait": summary(self._queue_times),
+                "render": summary(self._render_times),
+            }
+
+
+report_queue = ReportQueue()
+
+
+def main(argv=None):
+    from core.report import sample_report
+
+    parser = argparse.ArgumentParser(description="Submit a burst of sample reports and report queue timings.")
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-queued", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    reports = ReportQueue(workers=args.workers, max_queued=args.max_queued)
+    report = sample_report()
+    start = time.perf_counter()
+    jobs = []
+    for _ in range(args.jobs):
+        try:
+            jobs.append(reports.submit(report))
+        except queue.Full:
+            pass
+    while any(job.pending for job in jobs):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    stats = reports.stats()
+    print(f"{stats['completed']} reports in {elapsed:.2f}s ({stats['completed'] / elapsed:.1f} reports/sec), "
+          f"{stats['rejected']} rejected by the full queue, {stats['failed']} failed")
+    print(f"queue wait: mean {stats['queue_wait']['mean_ms']:.0f} ms, p95 {stats['queue_wait']['p95_ms']:.0f} ms")
+    print(f"render:     mean {stats['render']['mean_ms']:.0f} ms, p95 {stats['render']['p95_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Input fields collected by pages/01_CarbonFootprint.py and their allowed values.
+# The page builds its widgets from these, so they are the single source of truth
+# for the reachable input space.
+
+PLACEHOLDER = "Please select"
+
+SELECT_OPTIONS = {
+    "gender": ["Male", "Female"],
+    "social_activity": ["never", "sometimes", "often"],
+    "diet": ["omnivore", "vegetarian", "pescatarian", "vegan"],
+    "transport": ["private", "public", "walk/bicycle"],
+    "air_travel_frequency": ["never", "rarely", "frequently", "very frequently"],
+    "waste_bag_size": ["small", "medium", "large", "extra large"],
+    "heating_energy_source": ["coal", "natural gas", "electricity", "wood"],
+    "energy_efficiency": ["Yes", "No"],
+    "shower_frequency": ["daily", "twice a day", "less frequently", "more frequently"],
+}
+
+MULTI_OPTIONS = {
+    "recycling": ['Metal', 'Paper', 'Plastic', 'Glass', 'Electronics'],
+    "cooking_with": ['Grill', 'Airfryer', 'Stove', 'Oven', 'Microwave'],
+}
+
+# Inclusive (min, max) of the integer sliders / number inputs
+NUMERIC_RANGES = {
+    "monthly_grocery_bill": (50, 299),
+    "vehicle_monthly_distance_km": (0, 5000),
+    "waste_bag_weekly_count": (1, 7),
+    "tv_pc_daily_hours": (0, 16),
+    "new_clothes_monthly": (0, 25),
+    "internet_daily_hours": (0, 16),
+}
+
+BODY_TYPES = ["underweight", "normal", "overweight", "obese"]
+
+# How each field is named when it is shown back to the user
+FIELD_LABELS = {
+    "body_type": "Body type",
+    "gender": "Sex",
+    "social_activity": "Social activity",
+    "diet": "Diet",
+    "transport": "Transport",
+    "air_travel_frequency": "Air travel",
+    "waste_bag_size": "Waste bag size",
+    "heating_energy_source": "Heating energy source",
+    "energy_efficiency": "Energy-efficient devices",
+    "shower_frequency": "Shower frequency",
+    "monthly_grocery_bill": "Monthly grocery bill",
+    "vehicle_monthly_distance_km": "Vehicle monthly distance",
+    "waste_bag_weekly_count": "Waste bags per week",
+    "tv_pc_daily_hours": "Daily PC/TV hours",
+    "new_clothes_monthly": "New clothes monthly",
+    "internet_daily_hours": "Daily internet hours",
+    "recycling": "Recycling",
+    "cooking_with": "Cooking with",
+}
+
+# Key order of the input_data dict saved in st.session_state
+INPUT_COLUMNS = [
+    "body_type", "gender", "diet", "shower_frequency", "heating_energy_source",
+    "transport", "social_activity", "monthly_grocery_bill", "air_travel_frequency",
+    "vehicle_monthly_distance_km", "waste_bag_size", "waste_bag_weekly_count",
+    "tv_pc_daily_hours", "new_clothes_monthly", "internet_daily_hours",
+    "recycling", "energy_efficiency", "cooking_with",
+]
+
+# Column names the training notebook assigns (positionally) to the raw survey export
+SURVEY_COLUMNS = [
+    'body_type', 'gender', 'diet', 'shower_frequency', 'heating_energy_source',
+    'transport', 'vehicle_type', 'social_activity', 'monthly_grocery_bill',
+    'air_travel_frequency', 'vehicle_monthly_distance_km', 'waste_bag_size',
+    'waste_bag_weekly_count', 'tv_pc_daily_hours', 'new_clothes_monthly',
+    'internet_daily_hours', 'energy_efficiency', 'recycling', 'cooking_with', 'carbon_emission'
+]
+
+
+def body_type_for(height, weight):
+    bmi = weight / ((height / 100) ** 2)
+    return "underweight" if bmi < 18.5 else "normal" if bmi <= 24.9 else "overweight" if bmi <= 29.9 else "obese"
+
+
+def random_profile(rng):
+    """A uniformly random reachable input_data dict; ``rng`` is a ``random.Random``."""
+    profile = {column: rng.choice(options) for column, options in SELECT_OPTIONS.items()}
+    profile["body_type"] = rng.choice(BODY_TYPES)
+    profile.update({column: rng.randint(low, high) for column, (low, high) in NUMERIC_RANGES.items()})
+    profile.update({column: [o for o in options if rng.random() < 0.5] for column, options in MULTI_OPTIONS.items()})
+    return {column: profile[column] for column in INPUT_COLUMNS}
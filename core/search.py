@@ -0,0 +1,190 @@
+"""Hyperparameter search for the ensemble members using successive halving.
+
+Usage:
+    python -m core.search "Carbon Emission.csv"
+    python -m core.search "Carbon Emission.csv" --members RandomForest --folds 5 --workers 8
+
+Every configuration starts on a small fraction of each training fold; only the
+best 1/eta survive to the next rung, which gets eta times more rows, until the
+survivors are scored on the full folds. Fold matrices are cut once from the
+cached encoded training split and memory-mapped by the worker processes, and
+every finished (config, rung) is appended to a results log, so rerunning the
+same command after an interruption picks up where it stopped.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from core.training import CACHE_DIR, DEFAULT_MEMBERS, _key, make_member, stage_clean, stage_encode
+
+SEARCH_SPACES = {
+    # The grid the notebook's commented-out GridSearchCV used
+    "RandomForest": {
+        "n_estimators": [100, 200, 300],
+        "max_depth": [None, 10, 20, 30],
+        "min_samples_split": [2, 5, 10],
+        "min_samples_leaf": [1, 2, 4],
+    },
+    "XGBoost": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [4, 6, 8],
+        "learning_rate": [0.05, 0.1, 0.2],
+        "subsample": [0.8, 1.0],
+    },
+    "LightGBM": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [4, 6, -1],
+        "learning_rate": [0.05, 0.1, 0.2],
+        "num_leaves": [31, 63],
+    },
+}
+
+
+def grid(space):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def rung_fractions(eta, min_fraction):
+    fractions = [1.0]
+    while fractions[-1] / eta >= min_fraction:
+        fractions.append(fractions[-1] / eta)
+    return fractions[::-1]
+
+
+def prepare_folds(encode_key, arrays, cache_dir, n_folds, log=print):
+    """Write each fold's train/validation matrices once; returns their paths."""
+    from sklearn.model_selection import KFold
+
+    folds = []
+    splitter = KFold(n_splits=n_folds, shuffle=True, random_state=42)
+    for i, (train_idx, val_idx) in enumerate(splitter.split(arrays["X_train"])):
+        prefix = os.path.join(cache_dir, f"folds-{encode_key}-k{n_folds}-{i}")
+        paths = {name: f"{prefix}-{name}.npy" for name in ("X_fit", "y_fit", "X_val", "y_val")}
+        if not all(os.path.exists(path) for path in paths.values()):
+            np.save(paths["X_fit"], arrays["X_train"][train_idx])
+            np.save(paths["y_fit"], arrays["y_train"][train_idx])
+            np.save(paths["X_val"], arrays["X_train"][val_idx])
+            np.save(paths["y_val"], arrays["y_train"][val_idx])
+        folds.append(paths)
+    log(f"[search] {n_folds} folds ready")
+    return folds
+
+
+def _score_trial(member, params, fraction, fold_paths):
+    """Fit on the first ``fraction`` of a (pre-shuffled) fold and return validation R²."""
+    from sklearn.metrics import r2_score
+
+    X_fit = np.load(fold_paths["X_fit"], mmap_mode="r")
+    y_fit = np.load(fold_paths["y_fit"], mmap_mode="r")
+    rows = max(1, int(len(X_fit) * fraction))
+    base = dict(DEFAULT_MEMBERS[member], **params)
+
+    model = make_member(member, base, n_jobs=1)
+    model.fit(np.asarray(X_fit[:rows]), np.asarray(y_fit[:rows]))
+    return float(r2_score(np.load(fold_paths["y_val"]), model.predict(np.load(fold_paths["X_val"], mmap_mode="r"))))
+
+
+class ResultLog:
+    """Append-only JSONL of finished evaluations; reloaded on start so searches resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut off by an interrupted write
+                    self.results[record["key"]] = record
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def add(self, record):
+        self.results[record["key"]] = record
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def successive_halving(member, configs, folds, encode_key, results, executor, eta=3, min_fraction=1 / 9, log=print):
+    survivors = configs
+    for fraction in rung_fractions(eta, min_fraction):
+        keys = {_key("search", encode_key, member, config, fraction, len(folds)): config for config in survivors}
+
+        # Submit every missing (config, fold) pair of this rung at once
+        pending = {}
+        for key, config in keys.items():
+            if results.get(key) is None:
+                for i, fold in enumerate(folds):
+                    pending[executor.submit(_score_trial, member, config, fraction, fold)] = (key, i)
+
+        scores = {key: [None] * len(folds) for key in keys if results.get(key) is None}
+        start = time.perf_counter()
+        for future in as_completed(pending):
+            key, i = pending[future]
+            scores[key][i] = future.result()
+            if all(score is not None for score in scores[key]):
+                results.add({
+                    "key": key, "member": member, "params": keys[key], "fraction": fraction,
+                    "fold_scores": scores[key], "mean_r2": float(np.mean(scores[key])),
+                })
+
+        ranked = sorted(keys, key=lambda k: results.get(k)["mean_r2"], reverse=True)
+        log(f"[search] {member}: {len(keys)} configs on {fraction:.0%} of rows "
+            f"({len(pending)} fits, {time.perf_counter() - start:.1f}s); best R² {results.get(ranked[0])['mean_r2']:.4f}")
+        if fraction >= 1.0:
+            best = results.get(ranked[0])
+            return best["params"], best["mean_r2"]
+        survivors = [keys[k] for k in ranked[:max(1, len(ranked) // eta)]]
+
+
+def run_search(survey_path, members=None, cache_dir=CACHE_DIR, n_folds=5, eta=3, min_fraction=1 / 9, workers=None, log=print):
+    os.makedirs(cache_dir, exist_ok=True)
+    clean_key, df = stage_clean(survey_path, cache_dir, log=log)
+    encode_key, arrays, _ = stage_encode(clean_key, df, cache_dir, log=log)
+    folds = prepare_folds(encode_key, arrays, cache_dir, n_folds, log=log)
+    results = ResultLog(os.path.join(cache_dir, f"search-{encode_key}.jsonl"))
+
+    best = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for member in members or list(SEARCH_SPACES):
+            best[member] = successive_halving(
+                member, grid(SEARCH_SPACES[member]), folds, encode_key, results, executor,
+                eta=eta, min_fraction=min_fraction, log=log,
+            )
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the ensemble members.")
+    parser.add_argument("survey", help="Survey export (CSV or Parquet) with carbon_emission labels")
+    parser.add_argument("--members", nargs="+", choices=list(SEARCH_SPACES), default=None)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta configs per rung (default: 3)")
+    parser.add_argument("--min-fraction", type=float, default=1 / 9, help="Row fraction of the first rung (default: 1/9)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    best = run_search(
+        args.survey, members=args.members, cache_dir=args.cache_dir, n_folds=args.folds,
+        eta=args.eta, min_fraction=args.min_fraction, workers=args.workers,
+    )
+    print("Best configurations (pass to `python -m core.training`):")
+    for member, (params, score) in best.items():
+        flags = " ".join(f"--set {member}.{name}={json.dumps(value)}" for name, value in params.items())
+        print(f"  {member} (CV R² {score:.4f}): {flags}")
+
+
+if __name__ == "__main__":
+    main()
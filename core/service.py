@@ -0,0 +1,201 @@
+"""Standalone HTTP prediction service with request micro-batching.
+
+Usage:
+    python -m core.service --port 8600 --max-batch-size 64 --max-wait-ms 5
+
+Endpoints:
+    POST /predict   body: one input_data object, or {"profiles": [input_data, ...]}
+    GET  /health    model version plus batcher and cache counters
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from core.fast_path import select_model
+from core.features import get_feature_encoder
+from core.lookup_table import table_predictions
+from core.model_bundle import get_model_bundle, warm_up
+from core.prediction_cache import prediction_cache
+
+
+class MicroBatcher:
+    """Collects rows from concurrent callers and scores them with one ``model.predict``.
+
+    A batch is flushed when it reaches ``max_batch_size`` rows or when the oldest
+    row has waited ``max_wait_ms``, whichever comes first.
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=5.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, model, tag, row):
+        future = Future()
+        self._queue.put(((model, tag), row, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Rows are encoded against a specific bundle; never mix models in one predict call
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(item[0][1], []).append(item)
+            for tag, items in by_model.items():
+                model = items[0][0][0]
+                try:
+                    predictions = model.predict(np.vstack([row for _, row, _ in items]))
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, row, future), prediction in zip(items, predictions):
+                    prediction_cache.put(tag, row, float(prediction))
+                    future.set_result(float(prediction))
+            self.batches += 1
+            self.rows += len(batch)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+def predict_many(profiles, batcher, timeout=30.0):
+    """Encode each profile in the calling thread, then wait on the shared batcher.
+
+    Like ``predict_profile``, profiles the served lookup table covers are answered
+    from it and only the rest reach the model; the returned version then ends in
+    ``:table``.
+    """
+    bundle = get_model_bundle()
+    encoder = get_feature_encoder(bundle)
+    model, tag = select_model(bundle)
+    pending = []
+    served = table_predictions(bundle, profiles)
+    for profile, prediction in zip(profiles, served):
+        if prediction is not None:
+            pending.append(prediction)
+            continue
+        row = encoder.encode(profile)
+        cached = prediction_cache.get(tag, row)
+        pending.append(cached if cached is not None else batcher.submit(model, tag, row))
+    predictions = [p.result(timeout) if isinstance(p, Future) else p for p in pending]
+    if any(prediction is not None for prediction in served):
+        tag = f"{bundle.version}:table"
+    return predictions, tag
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    batcher = None  # set by make_server
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            version = get_model_bundle().version
+        except Exception as e:
+            self._send_json(503, {"status": "error", "error": str(e)})
+            return
+        self._send_json(200, {
+            "status": "ok",
+            "model_version": version,
+            "batcher": self.batcher.stats(),
+            "cache": prediction_cache.stats(),
+        })
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            single = "profiles" not in payload
+            profiles = [payload] if single else payload["profiles"]
+            predictions, version = predict_many(profiles, self.batcher)
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        if single:
+            self._send_json(200, {"prediction": predictions[0], "model_version": version})
+        else:
+            self._send_json(200, {"predictions": predictions, "model_version": version})
+
+    def log_message(self, format, *args):
+        pass  # one line per request is too noisy under load
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 resets connections under concurrent load
+
+
+def make_server(host="127.0.0.1", port=8600, max_batch_size=64, max_wait_ms=5.0):
+    handler = type("Handler", (PredictionHandler,), {"batcher": MicroBatcher(max_batch_size, max_wait_ms)})
+    return PredictionServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve carbon footprint predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Rows per model.predict call (default: 64)")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest a request waits for batch-mates (default: 5)")
+    args = parser.parse_args(argv)
+
+    warm_up()
+    server = make_server(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    print(f"Serving predictions on http://{args.host}:{args.port} (model {get_model_bundle().version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Reproducible training pipeline extracted from CarbonMajor.ipynb.
+
+Usage:
+    python -m core.training "Carbon Emission.csv"
+    python -m core.training "Carbon Emission.csv" --set RandomForest.n_estimators=500 --output-dir models
+
+Stages and their caches (under --cache-dir, default .cache/training):
+    clean    cleaned survey rows (Parquet), keyed on the input file's checksum
+    encode   train/test matrices (.npy) plus fitted preprocessor and dummy categories
+    fit      one pickle per ensemble member, keyed on its hyperparameters
+
+Changing a hyperparameter only refits that member; everything upstream is reused.
+The three members are fitted in parallel processes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from core.dataset import RANDOM_STATE, clean_survey, load_survey, split_survey
+from core.features import MULTILABEL_COLS, ONEHOT_COLS, ORDINAL_COLS
+from core.model_bundle import ARTIFACT_DIR, ARTIFACT_FILES, MODEL_DIR, load_pickles
+
+CACHE_DIR = ".cache/training"
+
+# Bump when a stage's code changes in a way that invalidates its cached output
+STAGE_VERSIONS = {"clean": 1, "encode": 1, "fit": 1}
+
+DEFAULT_MEMBERS = {
+    "XGBoost": {"n_estimators": 200, "max_depth": 6, "learning_rate": 0.1, "random_state": 42},
+    "LightGBM": {"n_estimators": 200, "max_depth": 6, "learning_rate": 0.1, "random_state": 42, "verbosity": -1},
+    "RandomForest": {"n_estimators": 300, "max_depth": 20, "min_samples_leaf": 2, "min_samples_split": 2, "random_state": 42},
+}
+
+
+def make_member(name, params, n_jobs=1):
+    if name == "XGBoost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(n_jobs=n_jobs, **params)
+    if name == "LightGBM":
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(n_jobs=n_jobs, **params)
+    if name == "RandomForest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_jobs=n_jobs, **params)
+    raise ValueError(f"Unknown ensemble member {name!r}")
+
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pickle_dump(obj, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _pickle_load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# --- Stage 1: clean ---
+def stage_clean(survey_path, cache_dir, log=print):
+    import pandas as pd
+
+    key = _key("clean", STAGE_VERSIONS["clean"], _file_checksum(survey_path))
+    path = os.path.join(cache_dir, f"clean-{key}.parquet")
+    if os.path.exists(path):
+        log(f"[clean] cached ({path})")
+        return key, pd.read_parquet(path)
+
+    start = time.perf_counter()
+    df = clean_survey(load_survey(survey_path))
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    log(f"[clean] {len(df):,} rows in {time.perf_counter() - start:.1f}s")
+    return key, df
+
+
+# --- Stage 2: split + encode ---
+def encode_split(X_train, X_test):
+    """Fit dummy categories and the ColumnTransformer on the training split, exactly as the notebook does."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+    from core.multilabel import expand_multilabel
+
+    dummy_info = {}
+    for column in MULTILABEL_COLS:
+        X_train, dummy_info[column] = expand_multilabel(X_train, column)
+        X_test, _ = expand_multilabel(X_test, column, dummy_info[column])
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('ordinal', OrdinalEncoder(), ORDINAL_COLS),
+            ('onehot', OneHotEncoder(drop='if_binary', handle_unknown='ignore', sparse_output=False), ONEHOT_COLS)
+        ],
+        remainder='passthrough'
+    )
+    X_train_transformed = preprocessor.fit_transform(X_train).astype(np.float64)
+    X_test_transformed = preprocessor.transform(X_test).astype(np.float64)
+
+    ohe_feature_names = preprocessor.named_transformers_['onehot'].get_feature_names_out(ONEHOT_COLS)
+    feature_order = ORDINAL_COLS + list(ohe_feature_names) + [col for col in X_train.columns if col not in ORDINAL_COLS + ONEHOT_COLS]
+    return X_train_transformed, X_test_transformed, preprocessor, dummy_info, feature_order
+
+
+def stage_encode(clean_key, df, cache_dir, test_size=0.2, log=print):
+    key = _key("encode", STAGE_VERSIONS["encode"], clean_key, test_size, RANDOM_STATE)
+    prefix = os.path.join(cache_dir, f"encode-{key}")
+    meta_path = f"{prefix}-meta.pkl"
+    if os.path.exists(meta_path):
+        log(f"[encode] cached ({prefix}-*)")
+        arrays = {name: np.load(f"{prefix}-{name}.npy") for name in ("X_train", "X_test", "y_train", "y_test")}
+        return key, arrays, _pickle_load(meta_path)
+
+    start = time.perf_counter()
+    X_train, X_test, y_train, y_test = split_survey(df, test_size=test_size)
+    X_train, X_test, preprocessor, dummy_info, feature_order = encode_split(X_train, X_test)
+    arrays = {
+        "X_train": X_train,
+        "X_test": X_test,
+        "y_train": y_train.to_numpy(dtype=np.float64),
+        "y_test": y_test.to_numpy(dtype=np.float64),
+    }
+    for name, array in arrays.items():
+        np.save(f"{prefix}-{name}.npy", array)
+    meta = {"preprocessor": preprocessor, "dummy_info": dummy_info, "feature_order": feature_order}
+    _pickle_dump(meta, meta_path)  # written last: its presence marks the stage complete
+    log(f"[encode] {X_train.shape[0]:,} train / {X_test.shape[0]:,} test rows, "
+        f"{X_train.shape[1]} features in {time.perf_counter() - start:.1f}s")
+    return key, arrays, meta
+
+
+# --- Stage 3: fit members (in parallel) ---
+def _fit_member(name, params, n_jobs, X_path, y_path, out_path):
+    start = time.perf_counter()
+    model = make_member(name, params, n_jobs=n_jobs)
+    model.fit(np.load(X_path, mmap_mode="r"), np.load(y_path))
+    _pickle_dump(model, out_path)
+    return name, time.perf_counter() - start
+
+
+def stage_fit(encode_key, cache_dir, members=None, n_jobs=None, log=print):
+    from joblib import Parallel, delayed
+
+    members = members or DEFAULT_MEMBERS
+    prefix = os.path.join(cache_dir, f"encode-{encode_key}")
+    paths = {
+        name: os.path.join(cache_dir, f"fit-{name}-{_key('fit', STAGE_VERSIONS['fit'], encode_key, name, params)}.pkl")
+        for name, params in members.items()
+    }
+
+    todo = [name for name, path in paths.items() if not os.path.exists(path)]
+    for name in members:
+        if name not in todo:
+            log(f"[fit] {name} cached")
+
+    if todo:
+        cores = n_jobs or os.cpu_count() or 1
+        per_member = max(1, cores // len(todo))
+        results = Parallel(n_jobs=min(len(todo), cores), backend="loky")(
+            delayed(_fit_member)(name, members[name], per_member, f"{prefix}-X_train.npy", f"{prefix}-y_train.npy", paths[name])
+            for name in todo
+        )
+        for name, seconds in results:
+            log(f"[fit] {name} in {seconds:.1f}s")
+
+    return {name: _pickle_load(path) for name, path in paths.items()}
+
+
+def assemble_ensemble(fitted):
+    """Build the notebook's VotingRegressor from already fitted members without refitting."""
+    from sklearn.ensemble import VotingRegressor
+    from sklearn.utils import Bunch
+
+    ensemble = VotingRegressor(estimators=list(fitted.items()))
+    ensemble.estimators_ = list(fitted.values())
+    ensemble.named_estimators_ = Bunch(**fitted)
+    return ensemble
+
+
+def evaluate(model, X, y, y_train_mean):
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    y_pred = model.predict(X)
+    mse = mean_squared_error(y, y_pred)
+    rmse = float(np.sqrt(mse))
+    return {
+        "mse": float(mse),
+        "rmse": rmse,
+        "r2": float(r2_score(y, y_pred)),
+        "relative_rmse": rmse / y_train_mean * 100,
+    }
+
+
+def export_artifacts(output_dir, ensemble, meta):
+    os.makedirs(output_dir, exist_ok=True)
+    artifacts = {
+        "model": ensemble,
+        "dummy_info": meta["dummy_info"],
+        "preprocessor": meta["preprocessor"],
+        "feature_order": meta["feature_order"],
+    }
+    for key, filename in ARTIFACT_FILES.items():
+        _pickle_dump(artifacts[key], os.path.join(output_dir, filename))
+
+
+def run_pipeline(survey_path, output_dir=MODEL_DIR, cache_dir=CACHE_DIR, members=None, n_jobs=None, test_size=0.2, log=print):
+    os.makedirs(cache_dir, exist_ok=True)
+    clean_key, df = stage_clean(survey_path, cache_dir, log=log)
+    encode_key, arrays, meta = stage_encode(clean_key, df, cache_dir, test_size=test_size, log=log)
+    fitted = stage_fit(encode_key, cache_dir, members=members, n_jobs=n_jobs, log=log)
+
+    ensemble = assemble_ensemble(fitted)
+    y_train_mean = float(arrays["y_train"].mean())
+    metrics = {name: evaluate(model, arrays["X_test"], arrays["y_test"], y_train_mean) for name, model in fitted.items()}
+    metrics["Ensemble"] = evaluate(ensemble, arrays["X_test"], arrays["y_test"], y_train_mean)
+
+    export_artifacts(output_dir, ensemble, meta)
+    log(f"[export] wrote {', '.join(ARTIFACT_FILES.values())} to {output_dir}")
+    from core.artifact import export_artifact
+
+    export_artifact(load_pickles(output_dir), os.path.join(output_dir, ARTIFACT_DIR), metrics=metrics)
+    log(f"[export] wrote the versioned artifact to {os.path.join(output_dir, ARTIFACT_DIR)}")
+    return ensemble, metrics
+
+
+def parse_overrides(items):
+    """Turn ``["RandomForest.n_estimators=500", ...]`` into a members dict based on the defaults."""
+    members = {name: dict(params) for name, params in DEFAULT_MEMBERS.items()}
+    for item in items or []:
+        target, _, raw = item.partition("=")
+        name, _, param = target.partition(".")
+        if name not in members or not param or not raw:
+            raise ValueError(f"Expected MEMBER.param=value with MEMBER in {list(members)}, got {item!r}")
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        members[name][param] = value
+    return members
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the carbon footprint ensemble from the survey export.")
+    parser.add_argument("survey", help="Survey export (CSV or Parquet), e.g. 'Carbon Emission.csv'")
+    parser.add_argument("--output-dir", default=MODEL_DIR, help="Where to write the model pickles (default: models/)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Stage cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--set", action="append", metavar="MEMBER.param=value", help="Override a member hyperparameter")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Cores to use (default: all)")
+    args = parser.parse_args(argv)
+
+    _, metrics = run_pipeline(
+        args.survey, output_dir=args.output_dir, cache_dir=args.cache_dir,
+        members=parse_overrides(args.set), n_jobs=args.n_jobs,
+    )
+    for name, scores in metrics.items():
+        print(f"{name}: R² {scores['r2']:.4f}, RMSE {scores['rmse']:.2f}, relative RMSE {scores['relative_rmse']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
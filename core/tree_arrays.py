@@ -0,0 +1,112 @@
+"""Regression trees as flat NumPy node arrays, scored without scikit-learn.
+
+Every tree of a forest is laid end to end in five arrays (scikit-learn's own
+node layout, with child indices offset to the concatenated position), so a
+forest can be saved as plain ``.npy`` files and memory-mapped back. A leaf's
+children point to the leaf itself, so scoring is ``max_depth`` rounds of
+gathers over all (row, tree) pairs with no bookkeeping of which are done.
+Inputs are compared in float32 against float64 thresholds and the trees are
+summed in order, exactly as scikit-learn does, so predictions match its own.
+"""
+import numpy as np
+
+TREE_FIELDS = ("children_left", "children_right", "feature", "threshold", "value")
+
+# Rows walked at once; bounds the (rows x trees) index arrays
+CHUNK_ROWS = 2048
+
+
+class TreeEnsemble:
+    """Mean of regression trees; ``arrays`` maps each of TREE_FIELDS to a 1-D array over all nodes."""
+
+    def __init__(self, arrays, roots, max_depth, n_features_in_):
+        # asarray keeps memory-mapped arrays mapped but drops np.memmap's per-result overhead
+        self.children_left = np.asarray(arrays["children_left"])
+        self.children_right = np.asarray(arrays["children_right"])
+        self.feature = np.asarray(arrays["feature"])
+        self.threshold = np.asarray(arrays["threshold"])
+        self.value = np.asarray(arrays["value"])
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features_in_)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """From a fitted DecisionTreeRegressor or forest of them (RandomForest/ExtraTrees)."""
+        trees = [model] if hasattr(model, "tree_") else list(model.estimators_)
+        parts = {field: [] for field in TREE_FIELDS}
+        roots = []
+        offset = 0
+        for tree in trees:
+            t = tree.tree_
+            leaf = t.children_left < 0
+            itself = np.arange(offset, offset + t.node_count)
+            parts["children_left"].append(np.where(leaf, itself, t.children_left + offset))
+            parts["children_right"].append(np.where(leaf, itself, t.children_right + offset))
+            parts["feature"].append(np.where(leaf, 0, t.feature))
+            parts["threshold"].append(t.threshold)
+            parts["value"].append(t.value.reshape(t.node_count, -1)[:, 0])
+            roots.append(offset)
+            offset += t.node_count
+        arrays = {
+            "children_left": np.concatenate(parts["children_left"]).astype(np.intp),
+            "children_right": np.concatenate(parts["children_right"]).astype(np.intp),
+            "feature": np.concatenate(parts["feature"]).astype(np.intp),
+            "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+            "value": np.concatenate(parts["value"]).astype(np.float64),
+        }
+        return cls(arrays, roots, max(tree.tree_.max_depth for tree in trees), model.n_features_in_)
+
+    def arrays(self):
+        return {field: getattr(self, field) for field in TREE_FIELDS}
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def _walk(self, X, visit=None):
+        """Leaf index per (row, tree); ``visit(node, child, feature)`` sees every step (leaves step onto themselves)."""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            child = np.where(X[rows, feature] <= self.threshold[node], self.children_left[node], self.children_right[node])
+            if visit is not None:
+                visit(node, child, feature)
+            node = child
+        return node
+
+    def apply(self, X):
+        return np.vstack([self._walk(X[start:start + CHUNK_ROWS]) for start in range(0, len(X), CHUNK_ROWS)])
+
+    def predict(self, X):
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.value[self._walk(X[start:start + CHUNK_ROWS])]
+            total = np.zeros(len(leaves), dtype=np.float64)
+            for column in leaves.T:
+                total += column
+            out[start:start + CHUNK_ROWS] = total / self.n_trees
+        return out
+
+    def contributions(self, X):
+        """Saabas path attribution: ``(contributions (n x features), bias (n,))`` summing to ``predict(X)``."""
+        X = np.asarray(X)
+        contributions = np.zeros((len(X), self.n_features_in_), dtype=np.float64)
+
+        for start in range(0, len(X), CHUNK_ROWS):
+            block = contributions[start:start + CHUNK_ROWS]  # view; filled in place
+
+            def visit(node, child, feature, block=block):
+                moved = child != node
+                row, _ = np.nonzero(moved)
+                np.add.at(block, (row, feature[moved]), self.value[child[moved]] - self.value[node[moved]])
+
+            self._walk(X[start:start + CHUNK_ROWS], visit)
+        bias = float(self.value[self.roots].mean())
+        return contributions / self.n_trees, np.full(len(X), bias)
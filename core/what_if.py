@@ -0,0 +1,118 @@
+"""What-if analysis: how the estimate moves when one answer changes.
+
+Usage:
+    python -m core.what_if            # rank the savings for the sample report's profile
+"""
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+
+from core import schema
+from core.fast_path import select_model
+from core.features import get_feature_encoder
+from core.model_bundle import get_model_bundle
+from core.multilabel import parse_multilabel
+
+NUMERIC_UNITS = {
+    "monthly_grocery_bill": "${}",
+    "vehicle_monthly_distance_km": "{} km",
+    "waste_bag_weekly_count": "{} bags",
+    "tv_pc_daily_hours": "{} hours",
+    "new_clothes_monthly": "{} items",
+    "internet_daily_hours": "{} hours",
+}
+
+# Gender is not something to change for a lower footprint
+FIXED_FIELDS = ("gender",)
+
+
+class WhatIf(NamedTuple):
+    field: str
+    change: str
+    value: object
+    prediction: float
+    saving: float
+
+
+def _sweep(current, low, high, steps):
+    values = {int(round(v)) for v in np.linspace(low, high, steps)}
+    values.add(max(low, current // 2))  # "halve it" is the question people ask most
+    values.discard(current)
+    return sorted(values)
+
+
+def perturbations(input_data, steps=6):
+    """Every single-field change of ``input_data``: ``[(field, change label, new value, profile), ...]``."""
+    changes = []
+    for column, options in schema.SELECT_OPTIONS.items():
+        if column in FIXED_FIELDS:
+            continue
+        for option in options:
+            if option != input_data[column]:
+                changes.append((column, f"{schema.FIELD_LABELS[column]}: {input_data[column]} → {option}", option))
+    for column, (low, high) in schema.NUMERIC_RANGES.items():
+        current = input_data[column]
+        unit = NUMERIC_UNITS[column]
+        for value in _sweep(current, low, high, steps):
+            changes.append((column, f"{schema.FIELD_LABELS[column]}: {unit.format(current)} → {unit.format(value)}", value))
+    for column, options in schema.MULTI_OPTIONS.items():
+        selected = parse_multilabel(input_data.get(column))
+        for option in options:
+            if option in selected:
+                changes.append((column, f"{schema.FIELD_LABELS[column]}: stop {option}", [o for o in selected if o != option]))
+            else:
+                changes.append((column, f"{schema.FIELD_LABELS[column]}: add {option}", selected + [option]))
+    return [(column, label, value, dict(input_data, **{column: value})) for column, label, value in changes]
+
+
+def what_if(input_data, bundle=None, steps=6):
+    """Score every single-field change in one ``predict`` call; returns ``(baseline, [WhatIf, ...])``, biggest saving first.
+
+    The unchanged profile is scored in the same batch, so savings are always
+    measured against the same model that scored the alternatives.
+    """
+    import pandas as pd
+
+    bundle = bundle or get_model_bundle()
+    encoder = get_feature_encoder(bundle)
+    model, _ = select_model(bundle)
+    changes = perturbations(input_data, steps)
+    frame = pd.DataFrame([input_data] + [profile for *_, profile in changes], columns=schema.INPUT_COLUMNS)
+    predictions = model.predict(encoder.encode_frame(frame))
+    baseline = float(predictions[0])
+    results = [
+        WhatIf(column, label, value, float(prediction), baseline - float(prediction))
+        for (column, label, value, _), prediction in zip(changes, predictions[1:])
+    ]
+    results.sort(key=lambda r: r.saving, reverse=True)
+    return baseline, results
+
+
+def best_per_field(results):
+    """The largest saving for each field, still ordered by saving."""
+    seen = set()
+    best = []
+    for result in results:
+        if result.field not in seen:
+            seen.add(result.field)
+            best.append(result)
+    return best
+
+
+def main(argv=None):
+    from core.report import SAMPLE_PROFILE
+
+    parser = argparse.ArgumentParser(description="Rank single-answer changes to a profile by how much they save.")
+    parser.add_argument("--steps", type=int, default=6, help="Points in each slider sweep (default: 6)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    baseline, results = what_if(SAMPLE_PROFILE, steps=args.steps)
+    print(f"Baseline {baseline:.2f} units; {len(results)} alternatives scored in one batch")
+    for result in results[:args.top]:
+        print(f"  {result.saving:>9.2f}  {result.change}")
+
+
+if __name__ == "__main__":
+    main()
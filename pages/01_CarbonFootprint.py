@@ -1,9 +1,12 @@
+import sqlite3
+
 import streamlit as st
-import pickle
-import pandas as pd
-import numpy as np
-import ast
-import base64
+from core.assets import page_background_css
+from core.client import predict_via_service, service_url
+from core.history import current_profile_id, history_store
+from core.model_bundle import current_version
+from core.prediction_cache import predict_profile
+from core.schema import MULTI_OPTIONS, NUMERIC_RANGES, PLACEHOLDER, SELECT_OPTIONS, body_type_for
 
 # --- Check if reset button was clicked (place at the top) ---
 if 'reset_clicked' in st.session_state and st.session_state.reset_clicked:
@@ -35,19 +38,11 @@ if 'reset_clicked' in st.session_state and st.session_state.reset_clicked:
     
     st.success("All inputs have been reset to default values!")
 
-# --- Load models ---
+# --- Model version (the model itself loads on the first prediction, shared across sessions) ---
+# With CARBON_API_URL set, predictions come from `python -m core.service` instead
+api_url = service_url()
 try:
-    with open('models/ensemble_model.pkl', 'rb') as ensemble:
-        model = pickle.load(ensemble)
-
-    with open('models/dummy_info.pkl', 'rb') as dummy:
-        dummy_info = pickle.load(dummy)
-
-    with open('models/preprocessor.pkl', 'rb') as process:
-        preprocessor = pickle.load(process)
-
-    with open('models/feature_order.pkl', 'rb') as order:
-        feature_order = pickle.load(order)
+    model_version = "service" if api_url else current_version()
 
 except FileNotFoundError as e:
     st.error(f"Error loading model files: {str(e)}")
@@ -56,43 +51,11 @@ except Exception as e:
     st.error(f"An unexpected error occurred: {str(e)}")
     st.stop()
 
-# Function to get base64 string of the image
-def get_base64(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-# Background image
-img_path = "Images/background_min.jpg"
-img_base64 = get_base64(img_path)
-
-# Inject CSS
-page_bg_img = f"""
-<style>
-[data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img_base64}");
-    background-size: cover;
-    background-position: center;
-    background-repeat: no-repeat;
-}}
-
-.container {{
-    background-color: rgba(255, 255, 255, 0.85);
-    padding: 3rem;
-    border-radius: 20px;
-    margin: auto;
-    max-width: 900px;
-    font-family: 'Arial', sans-serif;
-    color: #333;
-}}
-
-[data-testid="stSidebar"] {{
-    background-color: black;
-    color: #333;
-}}
-</style>
-"""
-st.markdown(page_bg_img, unsafe_allow_html=True)
+# Predictions are saved under this id, which is also kept in the page URL
+profile_id = current_profile_id()
+
+# Inject CSS (background served from static/, encoded at most once per process)
+st.markdown(page_background_css(), unsafe_allow_html=True)
 
 # Main content
 st.markdown('<div class="container">', unsafe_allow_html=True)
@@ -127,6 +90,9 @@ if 'initialized' not in st.session_state:
     st.session_state.prediction = None
     st.session_state.input_data = None
 
+def select_options(column):
+    return [PLACEHOLDER] + SELECT_OPTIONS[column]
+
 # --- Tabs ---
 tabs = ["👤 Personal", "🚗 Travel", "🗑 Waste", "⚡ Energy", "💊 Consumption"]
 tab = st.radio("Navigator", tabs, horizontal=True)
@@ -211,44 +177,44 @@ if tab == "👤 Personal":
     )
     
     st.selectbox(
-        "Sex", ["Please select", "Male", "Female"],
-        index=["Please select", "Male", "Female"].index(st.session_state.sex),
+        "Sex", select_options("gender"),
+        index=select_options("gender").index(st.session_state.sex),
         key="sex_input",
         on_change=update_sex
     )
     
     st.selectbox(
-        "Social Activity", ["Please select", "never", "sometimes", "often"],
-        index=["Please select", "never", "sometimes", "often"].index(st.session_state.social_activity),
+        "Social Activity", select_options("social_activity"),
+        index=select_options("social_activity").index(st.session_state.social_activity),
         key="social_input",
         on_change=update_social
     )
     
     st.selectbox(
-        "Diet", ["Please select", "omnivore", "vegetarian", "pescatarian", "vegan"],
-        index=["Please select", "omnivore", "vegetarian", "pescatarian", "vegan"].index(st.session_state.diet),
+        "Diet", select_options("diet"),
+        index=select_options("diet").index(st.session_state.diet),
         key="diet_input",
         on_change=update_diet
     )
 
 elif tab == "🚗 Travel":
     st.selectbox(
-        "Transportation", ["Please select", "private", "public", "walk/bicycle"],
-        index=["Please select", "private", "public", "walk/bicycle"].index(st.session_state.transport),
+        "Transportation", select_options("transport"),
+        index=select_options("transport").index(st.session_state.transport),
         key="transport_input",
         on_change=update_transport
     )
     
     st.slider(
-        "Monthly vehicle distance (Km)", 0, 5000,
+        "Monthly vehicle distance (Km)", *NUMERIC_RANGES["vehicle_monthly_distance_km"],
         value=st.session_state.vehicle_monthly_distance_km,
         key="vehicle_distance_input",
         on_change=update_vehicle_distance
     )
     
     st.selectbox(
-        "Air travel frequency", ["Please select", "never", "rarely", "frequently", "very frequently"],
-        index=["Please select", "never", "rarely", "frequently", "very frequently"].index(st.session_state.air_travel_frequency),
+        "Air travel frequency", select_options("air_travel_frequency"),
+        index=select_options("air_travel_frequency").index(st.session_state.air_travel_frequency),
         key="air_travel_input",
         on_change=update_air_travel
     )
@@ -256,21 +222,21 @@ elif tab == "🚗 Travel":
 elif tab == "🗑 Waste":
     st.multiselect(
         "Recycling materials",
-        ['Metal', 'Paper', 'Plastic', 'Glass', 'Electronics'],
+        MULTI_OPTIONS["recycling"],
         default=st.session_state.recycling,
         key="recycling_input",
         on_change=update_recycling
     )
 
     st.selectbox(
-        "Waste bag size", ["Please select", "small", "medium", "large", "extra large"],
-        index=["Please select", "small", "medium", "large", "extra large"].index(st.session_state.waste_bag_size),
+        "Waste bag size", select_options("waste_bag_size"),
+        index=select_options("waste_bag_size").index(st.session_state.waste_bag_size),
         key="waste_size_input",
         on_change=update_waste_size
     )
     
     st.number_input(
-        "Weekly waste bag count", 1, 7,
+        "Weekly waste bag count", *NUMERIC_RANGES["waste_bag_weekly_count"],
         value=st.session_state.waste_bag_weekly_count,
         key="waste_count_input",
         on_change=update_waste_count
@@ -278,36 +244,36 @@ elif tab == "🗑 Waste":
 
 elif tab == "⚡ Energy":
     st.selectbox(
-        "Heating power source", ["Please select", "coal", "natural gas", "electricity", "wood"],
-        index=["Please select", "coal", "natural gas", "electricity", "wood"].index(st.session_state.heating_energy_source),
+        "Heating power source", select_options("heating_energy_source"),
+        index=select_options("heating_energy_source").index(st.session_state.heating_energy_source),
         key="heating_input",
         on_change=update_heating
     )
     
     st.multiselect(
         "Cooking methods",
-        ['Grill', 'Airfryer', 'Stove', 'Oven', 'Microwave'],
+        MULTI_OPTIONS["cooking_with"],
         default=st.session_state.cooking_with,
         key="cooking_input",
         on_change=update_cooking
     )
     
     st.selectbox(
-        "Energy-efficient devices?", ["Please select", "Yes", "No"],
-        index=["Please select", "Yes", "No"].index(st.session_state.energy_efficiency),
+        "Energy-efficient devices?", select_options("energy_efficiency"),
+        index=select_options("energy_efficiency").index(st.session_state.energy_efficiency),
         key="energy_efficiency_input",
         on_change=update_energy_efficiency
     )
     
     st.slider(
-        "Daily PC/TV usage (hours)", 0, 16,
+        "Daily PC/TV usage (hours)", *NUMERIC_RANGES["tv_pc_daily_hours"],
         value=st.session_state.tv_pc_daily_hours,
         key="tv_pc_input",
         on_change=update_tv_pc
     )
     
     st.slider(
-        "Daily internet usage (hours)", 0, 16,
+        "Daily internet usage (hours)", *NUMERIC_RANGES["internet_daily_hours"],
         value=st.session_state.internet_daily_hours,
         key="internet_input",
         on_change=update_internet
@@ -315,21 +281,21 @@ elif tab == "⚡ Energy":
 
 elif tab == "💊 Consumption":
     st.selectbox(
-        "Shower frequency", ["Please select", "daily", "twice a day", "less frequently", "more frequently"],
-        index=["Please select", "daily", "twice a day", "less frequently", "more frequently"].index(st.session_state.shower_frequency),
+        "Shower frequency", select_options("shower_frequency"),
+        index=select_options("shower_frequency").index(st.session_state.shower_frequency),
         key="shower_input",
         on_change=update_shower
     )
     
     st.slider(
-        "Monthly grocery bill ($)", 50, 299,
+        "Monthly grocery bill ($)", *NUMERIC_RANGES["monthly_grocery_bill"],
         value=st.session_state.monthly_grocery_bill,
         key="grocery_input",
         on_change=update_grocery
     )
     
     st.slider(
-        "New clothes bought monthly", 0, 25,
+        "New clothes bought monthly", *NUMERIC_RANGES["new_clothes_monthly"],
         value=st.session_state.new_clothes_monthly,
         key="clothes_input",
         on_change=update_clothes
@@ -352,8 +318,7 @@ elif tab == "💊 Consumption":
                 st.warning("Please fill all required dropdowns.")
             else:
                 # --- Calculate Body Type ---
-                bmi = weight / ((height / 100) ** 2)
-                body_type = "underweight" if bmi < 18.5 else "normal" if bmi <= 24.9 else "overweight" if bmi <= 29.9 else "obese"
+                body_type = body_type_for(height, weight)
 
                 # --- Prepare Data ---
                 input_data = {
@@ -372,52 +337,25 @@ elif tab == "💊 Consumption":
                     "tv_pc_daily_hours": st.session_state.tv_pc_daily_hours,
                     "new_clothes_monthly": st.session_state.new_clothes_monthly,
                     "internet_daily_hours": st.session_state.internet_daily_hours,
-                    "recycling": str(st.session_state.recycling),
+                    "recycling": list(st.session_state.recycling),
                     "energy_efficiency": st.session_state.energy_efficiency,
-                    "cooking_with": str(st.session_state.cooking_with)
+                    "cooking_with": list(st.session_state.cooking_with)
                 }
 
-                df = pd.DataFrame([input_data])
-
-                def transform_multilabel(df, column_name, categories):
-                    df = df.copy()
-                    def parse(x):
-                        if isinstance(x, list) or isinstance(x, np.ndarray):
-                            return x
-                        if isinstance(x, str):
-                            return ast.literal_eval(x)
-                        if pd.isnull(x):
-                            return []
-                        return []
-                    for value in categories:
-                        df[value] = df[column_name].apply(lambda x: int(value in parse(x)))
-                    df.drop(columns=column_name, inplace=True)
-                    return df
-
-                df = transform_multilabel(df, 'recycling', dummy_info['recycling'])
-                df = transform_multilabel(df, 'cooking_with', dummy_info['cooking_with'])
-
-                ordinal_cols = ['body_type', 'shower_frequency', 'social_activity', 'air_travel_frequency', 'waste_bag_size', 'energy_efficiency']
-                onehot_cols = ['gender', 'diet', 'heating_energy_source', 'transport']
-
-                def transform_input(df_raw):
-                    df = df_raw.copy()
-                    X_transformed = preprocessor.transform(df)
-                    ohe_feature_names = preprocessor.named_transformers_['onehot'].get_feature_names_out(onehot_cols)
-                    all_feature_names = ordinal_cols + list(ohe_feature_names) + [col for col in df.columns if col not in ordinal_cols + onehot_cols]
-                    X_df = pd.DataFrame(X_transformed, columns=all_feature_names)
-                    X_df.reset_index(drop=True, inplace=True)
-                    return X_df
-
-                transformed_input = transform_input(df)
-                transformed_input = transformed_input.reindex(columns=feature_order, fill_value=0)
-
-                prediction = model.predict(transformed_input)
-                st.success(f"🌱 Your estimated carbon footprint is: **{prediction[0]:.2f} units**")
+                # Identical profiles (same encoded features, same model version) are served from cache
+                if api_url:
+                    prediction = predict_via_service(input_data, api_url)
+                else:
+                    prediction = predict_profile(input_data)
+                st.success(f"🌱 Your estimated carbon footprint is: **{prediction:.2f} units**")
 
                 # Save prediction
-                st.session_state.prediction = prediction[0]
+                st.session_state.prediction = prediction
                 st.session_state.input_data = input_data
+                try:
+                    history_store.record(profile_id, input_data, prediction, model_version)
+                except (sqlite3.Error, OSError) as e:
+                    st.warning(f"Your result could not be saved to your history: {e}")
                 
                 # Don't reset inputs after prediction to allow user to review and modify
                 st.info("You can review and modify your inputs if needed. Your data has been saved.")
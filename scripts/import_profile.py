@@ -0,0 +1,114 @@
+"""Measure cold-start import time and memory of the app's entry points.
+
+Usage:
+    python scripts/import_profile.py                      # every entry point, 3 fresh processes each
+    python scripts/import_profile.py --only scoring --top 15 --runs 5
+
+Each entry point is imported in a fresh interpreter, as a new Streamlit worker
+would. Reported per entry point: median wall time of the imports (and of the
+first prediction, for ``scoring``), peak RSS, which of the heavy optional
+libraries ended up loaded, and, with ``--top``, the slowest modules by
+cumulative import time from ``python -X importtime``.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["pandas", "sklearn", "scipy", "xgboost", "lightgbm", "matplotlib", "seaborn", "jinja2", "fpdf", "PIL", "pyarrow"]
+
+# What each page (or code path) imports before it can draw anything
+ENTRY_POINTS = {
+    "scoring": "from core.prediction_cache import predict_profile",
+    "tracker_page": (
+        "import streamlit; import core.assets, core.client, core.history, core.model_bundle, "
+        "core.prediction_cache, core.schema"
+    ),
+    "dashboard_page": (
+        "import streamlit; import core.history, core.quantiles, core.report, core.report_queue, "
+        "core.schema, core.what_if"
+    ),
+}
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+imported = time.perf_counter() - start
+first_prediction = None
+if {predict}:
+    import random
+    from core.schema import random_profile
+    profile = random_profile(random.Random(0))
+    start = time.perf_counter()
+    predict_profile(profile)
+    first_prediction = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{
+    "import_s": imported, "first_prediction_s": first_prediction, "heavy": heavy,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def run(code, predict):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    child = CHILD.format(code=code, predict=predict, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", child], capture_output=True, text=True, check=True, cwd=ROOT, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_modules(code, top):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         check=True, cwd=ROOT, env=env)
+    packages = {}
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            package = match.group(3).split(".")[0]
+            # Cumulative time of a package's outermost import
+            packages[package] = max(packages.get(package, 0), int(match.group(1)))
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per entry point (default: 3)")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest top-level packages")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        runs = [run(ENTRY_POINTS[name], predict=name == "scoring") for _ in range(args.runs)]
+        results[name] = {
+            "import_ms": float(np.median([r["import_s"] for r in runs]) * 1000),
+            "first_prediction_ms": (float(np.median([r["first_prediction_s"] for r in runs]) * 1000)
+                                    if runs[0]["first_prediction_s"] is not None else None),
+            "rss_mb": float(np.median([r["rss_mb"] for r in runs])),
+            "heavy": runs[0]["heavy"],
+        }
+        if args.top:
+            results[name]["slowest"] = slowest_modules(ENTRY_POINTS[name], args.top)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        first = f", first prediction {r['first_prediction_ms']:.0f} ms" if r["first_prediction_ms"] is not None else ""
+        print(f"{name:<16} imports {r['import_ms']:>6.0f} ms{first}, peak RSS {r['rss_mb']:.0f} MB")
+        print(f"{'':<16} loaded: {', '.join(r['heavy']) or '-'}")
+        for package, us in r.get("slowest", []):
+            print(f"{'':<18}{us / 1000:>8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
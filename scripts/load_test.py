@@ -0,0 +1,61 @@
+"""Fire concurrent requests at a running prediction service and report latency/throughput.
+
+Usage:
+    python -m core.service &
+    python scripts/load_test.py --url http://127.0.0.1:8600 --requests 2000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import schema  # noqa: E402
+
+
+def post(url, profile):
+    request = urllib.request.Request(
+        f"{url}/predict", data=json.dumps(profile).encode(),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8600")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=0, help="Reuse this many distinct profiles (0 = all distinct)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [schema.random_profile(rng) for _ in range(args.distinct or args.requests)]
+    profiles = [pool[i % len(pool)] for i in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        latencies = np.array(list(executor.map(lambda p: post(args.url, p), profiles)))
+    elapsed = time.perf_counter() - start
+
+    with urllib.request.urlopen(f"{args.url}/health") as response:
+        health = json.loads(response.read())
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}: {args.requests / elapsed:,.0f} req/sec")
+    print(f"latency p50 {np.percentile(latencies, 50) * 1000:.1f} ms, p99 {np.percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"batcher: {health['batcher']}")
+    print(f"cache: {health['cache']}")
+
+
+if __name__ == "__main__":
+    main()
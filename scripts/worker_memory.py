@@ -0,0 +1,167 @@
+"""Measure memory per worker when several processes serve the same model.
+
+Usage:
+    python scripts/worker_memory.py --workers 4                  # the model in models/
+    python scripts/worker_memory.py --demo-forest --workers 4    # an ensemble with training's default 300-tree forest
+
+For each way of loading the model, N worker processes load it, score the same
+random profiles and touch every page of the tree arrays, then stay alive
+together while /proc/<pid>/smaps_rollup is read:
+
+    pickles           every worker unpickles its own copy (no artifact)
+    artifact/private  CARBON_MODEL_MEMORY=private: tree arrays read into each worker
+    artifact/shared   the default: tree arrays memory-mapped, one copy in the page cache
+
+RSS counts a shared page in every worker that maps it; PSS splits it between
+them, so PSS is the honest per-worker cost. Every worker's predictions must be
+byte-identical across all modes, or the script exits with status 1.
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.model_bundle import ARTIFACT_DIR, ARTIFACT_FILES, MODEL_DIR  # noqa: E402
+
+LOADERS = {
+    "pickles": "from core.model_bundle import load_pickles; bundle = load_pickles({model_dir!r})",
+    "artifact/private": "from core.artifact import load_artifact; bundle = load_artifact({artifact!r}, shared=False)",
+    "artifact/shared": "from core.artifact import load_artifact; bundle = load_artifact({artifact!r}, shared=True)",
+}
+
+CHILD = """
+import hashlib, random, sys
+import pandas as pd
+from core import schema
+from core.features import get_feature_encoder
+from core.tree_arrays import TreeEnsemble
+{load}
+for member in getattr(bundle.model, "estimators_", [bundle.model]):
+    if isinstance(member, TreeEnsemble):
+        for array in member.arrays().values():
+            array.sum()  # fault in every page: the worst case for a long-running worker
+rng = random.Random(0)
+frame = pd.DataFrame([schema.random_profile(rng) for _ in range({profiles})])
+predictions = bundle.model.predict(get_feature_encoder(bundle).encode_frame(frame))
+print(hashlib.sha256(predictions.tobytes()).hexdigest(), flush=True)
+sys.stdin.read()
+"""
+
+
+def smaps(pid):
+    """``{field: MB}`` from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": values["Rss"],
+        "pss_mb": values["Pss"],
+        "private_mb": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def run_workers(load, workers, profiles):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    child = CHILD.format(load=load, profiles=profiles)
+    procs = [subprocess.Popen([sys.executable, "-c", child], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              text=True, cwd=ROOT, env=env) for _ in range(workers)]
+    try:
+        digests = [proc.stdout.readline().strip() for proc in procs]
+        if not all(digests):
+            raise SystemExit("a worker exited before reporting its predictions")
+        memory = [smaps(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return digests, memory
+
+
+def build_demo_forest(out_dir, rows, log=print):
+    """Write pickles and an artifact for an XGBoost/LightGBM/RandomForest ensemble with training's defaults.
+
+    The labels are the shipped model's predictions plus noise, so the trees grow
+    as deep as they would on the survey.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from core import schema
+    from core.artifact import export_artifact
+    from core.features import get_feature_encoder
+    from core.model_bundle import load_pickles
+    from core.training import DEFAULT_MEMBERS, assemble_ensemble, make_member
+
+    shipped = load_pickles()
+    encoder = get_feature_encoder(shipped)
+    rng = random.Random(0)
+    X = encoder.encode_frame(pd.DataFrame([schema.random_profile(rng) for _ in range(rows)]))
+    y = shipped.model.predict(X) + np.random.default_rng(0).normal(0, 0.1 * shipped.model.predict(X).std(), rows)
+
+    log(f"Fitting the default ensemble on {rows:,} synthetic rows")
+    fitted = {name: make_member(name, params).fit(X, y) for name, params in DEFAULT_MEMBERS.items()}
+    os.makedirs(out_dir, exist_ok=True)
+    for key, filename in ARTIFACT_FILES.items():
+        if key != "model":
+            shutil.copy(os.path.join(MODEL_DIR, filename), out_dir)
+    with open(os.path.join(out_dir, ARTIFACT_FILES["model"]), "wb") as f:
+        pickle.dump(assemble_ensemble(fitted), f)
+    export_artifact(load_pickles(out_dir), os.path.join(out_dir, ARTIFACT_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--profiles", type=int, default=2_000, help="Profiles each worker scores (default: 2000)")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Model directory with pickles and artifact/")
+    parser.add_argument("--demo-forest", action="store_true", help="Measure a freshly fitted default ensemble instead")
+    parser.add_argument("--rows", type=int, default=20_000, help="Synthetic training rows for --demo-forest")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    scratch = None
+    model_dir = args.model_dir
+    if args.demo_forest:
+        scratch = model_dir = tempfile.mkdtemp(prefix="carbon-demo-forest-")
+        build_demo_forest(model_dir, args.rows)
+    artifact = os.path.join(model_dir, ARTIFACT_DIR)
+    size = sum(entry.stat().st_size for entry in os.scandir(artifact)) / 2**20
+
+    results = {}
+    try:
+        for mode, load in LOADERS.items():
+            digests, memory = run_workers(load.format(model_dir=model_dir, artifact=artifact), args.workers, args.profiles)
+            results[mode] = {
+                "digests": sorted(set(digests)),
+                **{key: sum(m[key] for m in memory) / len(memory) for key in memory[0]},
+            }
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    identical = len({digest for r in results.values() for digest in r["digests"]}) == 1
+    if args.json:
+        print(json.dumps({"artifact_mb": size, "identical": identical, "modes": results}, indent=2))
+    else:
+        print(f"{args.workers} workers, artifact {size:.0f} MB on disk; mean per worker:")
+        print(f"  {'mode':<18}{'RSS MB':>9}{'PSS MB':>9}{'private MB':>12}")
+        for mode, r in results.items():
+            print(f"  {mode:<18}{r['rss_mb']:>9.0f}{r['pss_mb']:>9.0f}{r['private_mb']:>12.0f}")
+        print("Predictions identical in every worker and mode" if identical else "Predictions DIFFER between workers or modes")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()